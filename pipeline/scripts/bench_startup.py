@@ -0,0 +1,77 @@
+# bench_startup.py
+#
+# Startup-time benchmark for the pipeline entry points.
+#
+# For every script a workflow runs, times a bare `import` and (for scripts
+# with a CLI) `--help` in a fresh interpreter. Neither should touch the
+# database, the YouTube API or load an embedding model; if one of them
+# gets slow, something heavy has crept back into module import.
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (script, has an argparse CLI)
+ENTRY_POINTS = [
+    ("fetch_new_imdb_week.py", True),
+    ("fetch_new_imdb_month.py", False),
+    ("fetch_new_imdb_year.py", False),
+    ("fetch_metadata.py", True),
+    ("update_ratings.py", True),
+    ("fetch_youtube_batch.py", True),
+    ("generate_meta_data_embeddings.py", True),
+    ("generate_vibe_embeddings.py", True),
+    ("generate_combined_embeddings.py", True),
+    ("embedding_engine.py", True),
+]
+
+
+def time_command(args: List[str], repeat: int) -> Optional[float]:
+    """Median wall time of `args` over `repeat` runs; None if it fails."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run(args, cwd=SCRIPTS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - started
+
+        if proc.returncode != 0:
+            print(proc.stderr.decode("utf-8", "replace").strip().splitlines()[-1])
+            return None
+        samples.append(elapsed)
+
+    return statistics.median(samples)
+
+
+def _fmt(seconds: Optional[float]) -> str:
+    return "failed" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+
+def bench_startup(repeat: int = 3) -> None:
+    baseline = time_command([sys.executable, "-c", "pass"], repeat)
+    print(f"⏱️  Interpreter baseline: {_fmt(baseline)}")
+
+    for script, has_cli in ENTRY_POINTS:
+        module = script[:-3]
+        import_time = time_command([sys.executable, "-c", f"import {module}"], repeat)
+        help_time = time_command([sys.executable, script, "--help"], repeat) if has_cli else None
+
+        line = f"   {script:<36} import {_fmt(import_time):>8}"
+        if has_cli:
+            line += f"   --help {_fmt(help_time):>8}"
+        print(line)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time import and --help for each pipeline entry point")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (median is reported)")
+
+    args = parser.parse_args()
+
+    bench_startup(repeat=args.repeat)
@@ -0,0 +1,158 @@
+# bulk_writer.py
+#
+# Batched writes for pipeline scripts.
+#
+# Rows are staged in memory and flushed in one round-trip per batch:
+# COPY into a temp table shaped like the target columns, then a single
+# set-based merge into the real table. Against a remote Postgres (Neon)
+# this replaces one INSERT/UPDATE round-trip per row. The COPY uses the
+# binary format, so vectors go over the wire as raw float32 (vector_io).
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import Table, text
+
+import vector_io
+
+MODES = ("insert", "upsert", "update")
+
+
+class BulkWriter:
+    """Stage rows for `table` and merge them on `key` every `batch_size` rows.
+
+    mode:
+      - "insert": INSERT ... ON CONFLICT (key) DO NOTHING
+      - "upsert": INSERT ... ON CONFLICT (key) DO UPDATE SET <columns>
+      - "update": UPDATE ... FROM stage WHERE key matches (existing rows only)
+
+    With fill_only=True, only columns that are NULL in the existing row
+    are written; stored values are never overwritten ("update"/"upsert"
+    only).
+
+    `key` may be a list of columns for tables with a composite primary
+    key; keys are then tuples.
+
+    Each flush commits, so `batch_size` plays the role of the old
+    `commit_every`. Keys actually written are collected in `written`.
+
+    `on_flush(db, keys)` runs after the merge and before the commit, so
+    bookkeeping it writes (e.g. checkpoints) commits atomically with the
+    rows.
+    """
+
+    def __init__(
+        self,
+        db,
+        table: Table,
+        key: Union[str, Sequence[str]],
+        columns: Sequence[str],
+        mode: str = "upsert",
+        batch_size: int = 500,
+        fill_only: bool = False,
+        on_flush: Optional[Callable[[Any, List[Any]], None]] = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+
+        self.db = db
+        self.table = table
+        self.key = key
+        self.keys = [key] if isinstance(key, str) else list(key)
+        self.columns = self.keys + [c for c in columns if c not in self.keys]
+        self.mode = mode
+        self.batch_size = batch_size
+        self.fill_only = fill_only
+        self.on_flush = on_flush
+        self.written: List[Any] = []
+        self._rows: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        # Column type OIDs for the binary COPY, looked up on first flush
+        self._types: List[int] = []
+
+        digest = hashlib.md5(",".join(self.columns).encode("utf-8")).hexdigest()[:8]
+        self._stage = f"{table.name}_stage_{digest}"
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        # Last write wins; a merge may not touch the same key twice
+        self._rows[self._key_of(row)] = row
+        if self.batch_size and len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> List[Any]:
+        """Write all staged rows and commit. Returns the keys written."""
+        if not self._rows:
+            return []
+
+        cols = ", ".join(self.columns)
+        self.db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {self._stage} ON COMMIT DROP AS "
+            f"SELECT {cols} FROM {self.table.name} WITH NO DATA"
+        ))
+        self.db.execute(text(f"TRUNCATE {self._stage}"))
+
+        if not self._types:
+            self._types = vector_io.column_oids(self.db, self.table.name, self.columns)
+        vector_io.copy_rows(
+            self.db, self._stage, self.columns, self._types,
+            ([row.get(c) for c in self.columns] for row in self._rows.values()),
+        )
+
+        result = self.db.execute(text(self._merge_sql())).fetchall()
+        keys = [r[0] for r in result] if len(self.keys) == 1 else [tuple(r) for r in result]
+        if self.on_flush is not None:
+            self.on_flush(self.db, keys)
+        self.db.commit()
+
+        self.written.extend(keys)
+        self._rows.clear()
+        return keys
+
+    def _key_of(self, row: Dict[str, Any]) -> Any:
+        if len(self.keys) == 1:
+            return row[self.keys[0]]
+        return tuple(row[k] for k in self.keys)
+
+    def _merge_sql(self) -> str:
+        target = self.table.name
+        cols = ", ".join(self.columns)
+        keys = ", ".join(self.keys)
+        updates = [c for c in self.columns if c not in self.keys]
+
+        if self.mode == "update":
+            if self.fill_only:
+                assignments = ", ".join(f"{c} = COALESCE(t.{c}, s.{c})" for c in updates)
+            else:
+                assignments = ", ".join(f"{c} = s.{c}" for c in updates)
+            match = " AND ".join(f"t.{k} = s.{k}" for k in self.keys)
+            returning = ", ".join(f"t.{k}" for k in self.keys)
+            return (
+                f"UPDATE {target} AS t SET {assignments} "
+                f"FROM {self._stage} AS s WHERE {match} "
+                f"RETURNING {returning}"
+            )
+
+        if self.mode == "upsert" and updates:
+            if self.fill_only:
+                sets = [f"{c} = COALESCE({target}.{c}, EXCLUDED.{c})" for c in updates]
+            else:
+                sets = [f"{c} = EXCLUDED.{c}" for c in updates]
+            conflict = "DO UPDATE SET " + ", ".join(sets)
+        else:
+            conflict = "DO NOTHING"
+
+        return (
+            f"INSERT INTO {target} ({cols}) SELECT {cols} FROM {self._stage} "
+            f"ON CONFLICT ({keys}) {conflict} "
+            f"RETURNING {keys}"
+        )
@@ -0,0 +1,141 @@
+# checkpoints.py
+#
+# Resumable job runs.
+#
+# A run is identified by its job name and parameters. It records every
+# item it has finished (written or given up on) in pipeline_run_items,
+# together with its progress in pipeline_runs. If a run dies (crash,
+# runner timeout), the next run of the same job with the same parameters
+# picks up the unfinished run and skips the items it already handled,
+# so no OMDb call is repeated.
+#
+# Marks are only staged in memory until they are saved; passing
+# `checkpoint.on_flush` to a BulkWriter saves them in the same
+# transaction as the rows they describe.
+
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import pipeline_runs, pipeline_run_items
+
+# Unfinished runs older than this are abandoned instead of resumed
+RESUME_MAX_AGE = timedelta(days=3)
+
+DONE = "done"
+FAILED = "failed"
+
+
+def params_hash(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class Checkpoint:
+    def __init__(self, run_id: int, job: str, finished: Set[str], offset: int, resumed: bool):
+        self.run_id = run_id
+        self.job = job
+        self.finished = finished
+        self.offset = offset
+        self.resumed = resumed
+        self._staged: Dict[str, str] = {}
+
+    @classmethod
+    def start(cls, db, job: str, params: Optional[Dict[str, Any]] = None) -> "Checkpoint":
+        """Resume the latest unfinished run of `job` with `params`, or start one.
+
+        Commits.
+        """
+        digest = params_hash(params or {})
+        now = datetime.now(timezone.utc)
+
+        run = db.execute(
+            select(pipeline_runs)
+            .where(
+                pipeline_runs.c.job == job,
+                pipeline_runs.c.params_hash == digest,
+                pipeline_runs.c.status == "running",
+            )
+            .order_by(pipeline_runs.c.started_at.desc())
+            .limit(1)
+        ).first()
+
+        if run is not None and now - run.updated_at <= RESUME_MAX_AGE:
+            finished = set(db.execute(
+                select(pipeline_run_items.c.item).where(pipeline_run_items.c.run_id == run.id)
+            ).scalars())
+            db.commit()
+            print(f"⏯ Resuming {job} run #{run.id}: {len(finished)} items already done (offset {run.last_offset})")
+            return cls(run.id, job, finished, run.last_offset, resumed=True)
+
+        if run is not None:
+            db.execute(update(pipeline_runs).where(pipeline_runs.c.id == run.id).values(status="abandoned"))
+
+        run_id = db.execute(
+            insert(pipeline_runs)
+            .values(job=job, params_hash=digest, status="running", started_at=now, updated_at=now,
+                    items_done=0, last_offset=0)
+            .returning(pipeline_runs.c.id)
+        ).scalar_one()
+        db.commit()
+        return cls(run_id, job, set(), 0, resumed=False)
+
+    def is_done(self, item: str) -> bool:
+        return item in self.finished or item in self._staged
+
+    def pending(self, items: Iterable[str]) -> List[str]:
+        """`items` minus those this run already finished, order kept."""
+        return [i for i in items if not self.is_done(i)]
+
+    def mark(self, item: str, status: str = DONE) -> None:
+        """Stage `item` as finished. Mark before handing its row to a
+        BulkWriter, so a flush that writes the row also saves the mark."""
+        if item not in self._staged:
+            self.offset += 1
+        self._staged[item] = status
+
+    def on_flush(self, db, keys: List[Any]) -> None:
+        """BulkWriter hook: save staged marks inside the flush transaction."""
+        self._save(db)
+
+    def save(self, db) -> None:
+        """Save staged marks on their own (e.g. failures with nothing to write)."""
+        self._save(db)
+        db.commit()
+
+    def finish(self, db) -> None:
+        """Close the run; its per-item rows are no longer needed. Commits."""
+        self._save(db)
+        db.execute(delete(pipeline_run_items).where(pipeline_run_items.c.run_id == self.run_id))
+        db.execute(
+            update(pipeline_runs)
+            .where(pipeline_runs.c.id == self.run_id)
+            .values(status="done", finished_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+
+    def _save(self, db) -> None:
+        if self._staged:
+            stmt = pg_insert(pipeline_run_items).values([
+                {"run_id": self.run_id, "item": item, "status": status}
+                for item, status in self._staged.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[pipeline_run_items.c.run_id, pipeline_run_items.c.item],
+                set_={"status": stmt.excluded.status},
+            ))
+            self.finished.update(self._staged)
+            self._staged.clear()
+
+        db.execute(
+            update(pipeline_runs)
+            .where(pipeline_runs.c.id == self.run_id)
+            .values(
+                items_done=len(self.finished),
+                last_offset=self.offset,
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
@@ -1,7 +1,10 @@
 import os
-import psycopg
+import threading
+from typing import Optional
+
 from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
 
 
@@ -10,14 +13,36 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=True, connect_args={"sslmode": "require"})
+# Log every SQL statement only when asked to (SQL_ECHO=1)
+SQL_ECHO = os.getenv("SQL_ECHO", "0") == "1"
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """Create the SQLAlchemy engine on first use, so importing a script
+    (or running it with --help) never touches the database."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(DATABASE_URL, echo=SQL_ECHO, connect_args={"sslmode": "require"})
+        return _engine
+
+
+class _LazySession(Session):
+    def __init__(self, **kwargs):
+        # sessionmaker always passes bind (None unless configured)
+        if kwargs.get("bind") is None:
+            kwargs["bind"] = get_engine()
+        super().__init__(**kwargs)
+
 
 # Metadata object used for creating tables later (if needed)
 metadata = MetaData()
 
-# Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Session factory; binds to the engine when the first session is opened
+SessionLocal = sessionmaker(class_=_LazySession, autocommit=False, autoflush=False)
 
 
 def get_db():
@@ -0,0 +1,225 @@
+# embedding_engine.py
+#
+# Multi-process sentence embedding for the embedding scripts.
+#
+# Each worker process loads the model once and encodes whole text batches
+# pulled from the pool's task queue; results come back to the parent in
+# submission order, where a single BulkWriter does all DB writes.
+# With workers=1 everything runs in-process (no pool, no extra model copy).
+#
+# The inference backend is selectable (EMBEDDING_BACKEND / --backend):
+#   - "torch":     reference PyTorch model
+#   - "onnx":      ONNX Runtime export of the same weights
+#   - "onnx-int8": ONNX Runtime, int8 dynamically quantized export
+# Run `python embedding_engine.py --parity` to measure how far a backend
+# drifts from the reference before switching a job over.
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import multiprocessing
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+VECTOR_DIM = 384
+
+# backend -> (sentence-transformers backend, ONNX file in the model repo).
+# The int8 file can be swapped for another quantized export of the model
+# repo (e.g. onnx/model_qint8_arm64.onnx) with EMBEDDING_ONNX_FILE.
+BACKENDS = {
+    "torch": ("torch", None),
+    "onnx": ("onnx", "onnx/model.onnx"),
+    "onnx-int8": ("onnx", os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")),
+}
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+
+def model_tag(model_name: str = MODEL_NAME, backend: Optional[str] = None) -> str:
+    """What a stored vector was computed with; backends differ slightly, so
+    vectors from different backends must not share one tag."""
+    return f"{model_name}:{backend or EMBEDDING_BACKEND}"
+
+# 0 = one worker per CPU core
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))
+ENCODE_BATCH_SIZE = 64
+
+_model = None
+
+
+def _load_model(model_name: str, backend: str = EMBEDDING_BACKEND, threads: Optional[int] = None):
+    global _model
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {sorted(BACKENDS)}, got {backend!r}")
+
+    st_backend, onnx_file = BACKENDS[backend]
+    kwargs = {}
+
+    if st_backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+    else:
+        model_kwargs = {"file_name": onnx_file}
+        if threads:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            model_kwargs["session_options"] = options
+        kwargs = {"backend": st_backend, "model_kwargs": model_kwargs}
+
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name, **kwargs)
+
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, VECTOR_DIM), dtype=np.float32)
+
+    return _model.encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    ).astype(np.float32, copy=False)
+
+
+class EmbeddingEngine:
+    """Normalized float32 embeddings, spread over `workers` processes."""
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        workers: Optional[int] = None,
+        batch_size: int = ENCODE_BATCH_SIZE,
+        backend: Optional[str] = None,
+    ):
+        cpus = os.cpu_count() or 1
+        self.model_name = model_name
+        self.backend = backend or EMBEDDING_BACKEND
+        self.workers = workers or EMBEDDING_WORKERS or cpus
+        self.batch_size = batch_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        if self.workers == 1:
+            _load_model(model_name, self.backend)
+        else:
+            # spawn: never fork a parent that may already hold torch threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_model,
+                initargs=(model_name, self.backend, max(1, cpus // self.workers)),
+            )
+
+    def __enter__(self) -> "EmbeddingEngine":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode `texts` into an (N, 384) array, using every worker."""
+        if self._pool is None:
+            return _encode(texts, self.batch_size)
+
+        # Split so each worker gets a share of one large request
+        step = max(self.batch_size, -(-len(texts) // self.workers))
+        parts = [texts[i:i + step] for i in range(0, len(texts), step)]
+        results = list(self._pool.map(_encode, parts, [self.batch_size] * len(parts)))
+        return np.vstack(results) if results else _encode([], self.batch_size)
+
+    def imap(self, batches: Iterable[Tuple[Any, List[str]]]) -> Iterator[Tuple[Any, np.ndarray]]:
+        """Encode a stream of (key, texts) batches; yields (key, vectors) in order.
+
+        Keeps 2 batches per worker queued, so the caller can read the next
+        batches from the DB while workers encode.
+        """
+        if self._pool is None:
+            for key, texts in batches:
+                yield key, _encode(texts, self.batch_size)
+            return
+
+        batches = iter(batches)
+        pending = deque(
+            (key, self._pool.submit(_encode, texts, self.batch_size))
+            for key, texts in islice(batches, self.workers * 2)
+        )
+        while pending:
+            key, future = pending.popleft()
+            nxt = next(batches, None)
+            if nxt is not None:
+                pending.append((nxt[0], self._pool.submit(_encode, nxt[1], self.batch_size)))
+            yield key, future.result()
+
+
+def parity_check(texts: List[str], backend: str, model_name: str = MODEL_NAME, workers: Optional[int] = None) -> Dict[str, float]:
+    """Cosine similarity between `backend` and the torch reference on `texts`."""
+    with EmbeddingEngine(model_name, workers=workers, backend="torch") as engine:
+        reference = engine.embed_batch(texts)
+    with EmbeddingEngine(model_name, workers=workers, backend=backend) as engine:
+        candidate = engine.embed_batch(texts)
+
+    # Both sides are unit-normalized, so the row-wise dot product is the cosine
+    cosines = np.einsum("ij,ij->i", reference, candidate)
+    return {
+        "texts": len(texts),
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+    }
+
+
+def _sample_texts(limit: int) -> List[str]:
+    from sqlalchemy import select, func
+    from db import SessionLocal
+    from models import titles
+    from generate_meta_data_embeddings import build_embedding_text
+
+    db = SessionLocal()
+    rows = db.execute(
+        select(titles.c.title, titles.c.year, titles.c.type, titles.c.genres, titles.c.plot)
+        .where(titles.c.plot != None)
+        .order_by(func.random())
+        .limit(limit)
+    ).fetchall()
+    db.close()
+    return [build_embedding_text(row) for row in rows]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against the torch reference")
+    parser.add_argument("--parity", action="store_true", help="report cosine drift on a sample of title texts")
+    parser.add_argument("--backend", default="onnx-int8", choices=sorted(BACKENDS), help="backend to compare")
+    parser.add_argument("--sample", type=int, default=500, help="titles to sample from the database")
+    parser.add_argument("--workers", type=int, default=1, help="embedding processes per backend")
+
+    args = parser.parse_args()
+
+    if args.parity:
+        texts = _sample_texts(args.sample)
+        if not texts:
+            raise SystemExit("❌ No titles with plots to compare on")
+
+        started = time.perf_counter()
+        report = parity_check(texts, args.backend, workers=args.workers)
+        print(
+            f"🔬 {args.backend} vs torch on {report['texts']} texts: "
+            f"mean cosine {report['mean_cosine']:.5f}, min {report['min_cosine']:.5f} "
+            f"({time.perf_counter() - started:.1f}s)"
+        )
+    else:
+        parser.print_help()
@@ -0,0 +1,56 @@
+# embedding_profiles.py
+#
+# Named weight profiles for combined embeddings.
+#
+# Profiles are read from embedding_profiles.json next to this file, or from
+# the file named by EMBEDDING_PROFILES_PATH. Each profile maps a source
+# ("plot", "youtube", "reddit") to its weight:
+#
+#   {"default": {"plot": 0.7, "youtube": 0.3, "reddit": 0.0},
+#    "vibe_heavy": {"plot": 0.5, "youtube": 0.5}}
+#
+# "default" is what the backend serves (embeddings.combined_embedding);
+# other profiles are stored in combined_embeddings for A/B comparisons.
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SOURCES = ("plot", "youtube", "reddit")
+DEFAULT_PROFILE = "default"
+
+PROFILES_PATH = os.getenv(
+    "EMBEDDING_PROFILES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_profiles.json"),
+)
+
+
+def load_profiles(path: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Read and validate weight profiles; unlisted sources get weight 0."""
+    with open(path or PROFILES_PATH, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    if DEFAULT_PROFILE not in raw:
+        raise ValueError(f"embedding profiles must define {DEFAULT_PROFILE!r}")
+
+    profiles = {}
+    for name, weights in raw.items():
+        unknown = set(weights) - set(SOURCES)
+        if unknown:
+            raise ValueError(f"profile {name!r}: unknown sources {sorted(unknown)}")
+        if any(w < 0 for w in weights.values()) or not any(w > 0 for w in weights.values()):
+            raise ValueError(f"profile {name!r}: weights must be >= 0 with at least one > 0")
+
+        profiles[name] = {source: float(weights.get(source, 0.0)) for source in SOURCES}
+
+    return profiles
+
+
+def weights_hash(weights: Dict[str, float]) -> str:
+    """Identifies the weights a combined vector was built with."""
+    return hashlib.sha256(json.dumps(weights, sort_keys=True).encode("utf-8")).hexdigest()[:16]
@@ -1,40 +1,19 @@
-import os
-import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 
-import requests
-
 from db import SessionLocal
 from models import titles
+from bulk_writer import BulkWriter
+from checkpoints import FAILED, Checkpoint
+from omdb_client import NOT_FOUND_ERRORS, configure_omdb_client, get_omdb_client
+from schema import ensure_schema
 
 load_dotenv()
 
 
-OMDB_URL = "http://www.omdbapi.com/"
-
-
-def fetch_omdb_metadata(imdb_id: str, retries: int = 3, backoff: float = 0.5) -> Optional[Dict[str, Any]]:
-    api_key = os.getenv("OMDB_API_KEY")
-    if not api_key:
-        raise RuntimeError("OMDB_API_KEY not set in environment")
-
-    params = {"i": imdb_id, "apikey": api_key, "r": "json", "plot": "full"}
-    for attempt in range(1, retries + 1):
-        try:
-            resp = requests.get(OMDB_URL, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            if data.get("Response") == "True":
-                return data
-            else:
-                return None
-        except Exception:
-            if attempt < retries:
-                time.sleep(backoff * attempt)
-                continue
-            return None
+def fetch_omdb_metadata(imdb_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    return get_omdb_client().fetch(imdb_id, fields=fields)
 
 
 def parse_release_date(released_value: Optional[str]):
@@ -54,8 +33,7 @@ def _to_list(field: Optional[str]) -> List[str]:
     return [s.strip() for s in field.split(",") if s.strip()]
 
 
-def fetch_and_parse_omdb(imdb_id: str) -> Optional[Dict[str, Any]]:
-    raw = fetch_omdb_metadata(imdb_id)
+def parse_omdb(raw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not raw:
         return None
 
@@ -72,6 +50,12 @@ def fetch_and_parse_omdb(imdb_id: str) -> Optional[Dict[str, Any]]:
     except Exception:
         imdb_rating = None
 
+    imdb_votes = raw.get("imdbVotes")
+    try:
+        imdb_votes = int(imdb_votes.replace(",", "")) if imdb_votes and imdb_votes != "N/A" else None
+    except Exception:
+        imdb_votes = None
+
     return {
         "title": title,
         "year": year,
@@ -83,58 +67,112 @@ def fetch_and_parse_omdb(imdb_id: str) -> Optional[Dict[str, Any]]:
         "producers": _to_list(raw.get("Production")),
         "poster_url": raw.get("Poster") if raw.get("Poster") != "N/A" else None,
         "imdb_rating": imdb_rating,
+        "imdb_votes": imdb_votes,
         "release_date": parse_release_date(raw.get("Released")),
         "actors": _to_list(raw.get("Actors")),
         "raw": raw,
     }
 
 
-def fetch_and_update_metadata(batch_sleep_seconds: float = 0.2, commit_every: int = 200):
+def omdb_error(raw: Optional[Dict[str, Any]]) -> Optional[str]:
+    """OMDb's error answer in a fetch(..., errors=True) result, if any.
+
+    None for a title answer and for a failed request (raw is None).
+    """
+    if raw and raw.get("Response") != "True":
+        return raw.get("Error")
+    return None
+
+
+def fetch_and_parse_omdb(imdb_id: str) -> Optional[Dict[str, Any]]:
+    return parse_omdb(fetch_omdb_metadata(imdb_id))
+
+
+def fetch_and_parse_many(
+    imdb_ids: Iterable[str],
+    fields: Optional[Sequence[str]] = None,
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Concurrent fetch_and_parse_omdb; yields (imdb_id, meta) in input order.
+
+    `fields` lists the OMDb fields the caller actually uses, so cached
+    responses can be reused as long as those fields are fresh enough.
+    """
+    for imdb_id, raw in get_omdb_client().fetch_many(imdb_ids, fields=fields):
+        yield imdb_id, parse_omdb(raw)
+
+
+def print_omdb_cache_stats() -> None:
+    cache = get_omdb_client().cache
+    if cache is not None:
+        print(f"   🗄 OMDb cache: {cache.summary()}")
+
+
+def missing_metadata_clause():
+    """SQL condition: the title row lacks at least one OMDb-backed field."""
+    return (
+        (titles.c.plot == None)
+        | (titles.c.directors == None)
+        | (titles.c.writers == None)
+        | (titles.c.producers == None)
+        | (titles.c.genres == None)
+        | (titles.c.poster_url == None)
+        | (titles.c.imdb_rating == None)
+        | (titles.c.release_date == None)
+        | (titles.c.actors == None)
+    )
+
+
+METADATA_COLUMNS = [
+    "title", "year", "type", "genres", "plot", "directors", "writers",
+    "producers", "poster_url", "imdb_rating", "release_date", "actors",
+]
+
+
+def fetch_and_update_metadata(commit_every: int = 200):
     """Fetch full OMDb metadata for titles missing key fields and update DB.
 
     Updates columns present in `titles` model: `title`, `year`, `type`,
     `genres`, `plot`, `directors`, `writers`, `producers`, `poster_url`,
     `imdb_rating`, `release_date`, `actors`.
+
+    An interrupted run is resumed by the next one (see checkpoints.py):
+    titles OMDb did not know are not fetched again; titles that failed
+    for any other reason are.
     """
+    ensure_schema()
     db = SessionLocal()
 
     # Select rows that are missing any important metadata
     result = db.execute(
-        titles.select().where(
-            (titles.c.imdb_id != None)
-            & (
-                (titles.c.plot == None)
-                | (titles.c.directors == None)
-                | (titles.c.writers == None)
-                | (titles.c.producers == None)
-                | (titles.c.genres == None)
-                | (titles.c.poster_url == None)
-                | (titles.c.imdb_rating == None)
-                | (titles.c.release_date == None)
-                | (titles.c.actors == None)
-            )
-        )
+        titles.select().where((titles.c.imdb_id != None) & missing_metadata_clause())
     ).fetchall()
 
+    checkpoint = Checkpoint.start(db, "fetch_metadata")
+    result = [row for row in result if not checkpoint.is_done(row.imdb_id)]
+
     print(f"🔍 Found {len(result)} titles that need OMDb metadata.")
 
-    updated = 0
     failed = 0
 
-    for idx, row in enumerate(result, start=1):
-        imdb_id = row.imdb_id
-        title = row.title
+    writer = BulkWriter(db, titles, "id", METADATA_COLUMNS, mode="update", batch_size=0, on_flush=checkpoint.on_flush)
+    fetched = get_omdb_client().fetch_many([row.imdb_id for row in result], errors=True)
 
-        print(f"📡 ({idx}/{len(result)}) Fetching OMDb for {imdb_id} - {title}")
+    for idx, (row, (imdb_id, raw)) in enumerate(zip(result, fetched), start=1):
+        print(f"📡 ({idx}/{len(result)}) Fetched OMDb for {imdb_id} - {row.title}")
 
-        meta = fetch_and_parse_omdb(imdb_id)
+        error = omdb_error(raw)
+        meta = parse_omdb(raw) if not error else None
         if not meta:
-            print(f"❌ No OMDb data found for {imdb_id}")
+            print(f"❌ No OMDb data found for {imdb_id}" + (f": {error}" if error else ""))
             failed += 1
-            time.sleep(batch_sleep_seconds)
+            # Only give up on titles OMDb does not know; a resumed run
+            # retries anything else
+            if error in NOT_FOUND_ERRORS:
+                checkpoint.mark(imdb_id, FAILED)
             continue
 
         vals = {
+            "id": row.id,
             "title": meta.get("title") or row.title,
             "year": meta.get("year") or row.year,
             "type": meta.get("type") or row.type,
@@ -149,29 +187,37 @@ def fetch_and_update_metadata(batch_sleep_seconds: float = 0.2, commit_every: in
             "actors": meta.get("actors") or row.actors,
         }
 
-        update_stmt = (
-            titles.update()
-            .where(titles.c.id == row.id)
-            .values(**vals)
-        )
-
-        db.execute(update_stmt)
-        updated += 1
-        print(f"   ✔ Updated: {imdb_id}")
+        checkpoint.mark(imdb_id)
+        writer.add(vals)
+        print(f"   ✔ Staged update: {imdb_id}")
 
         if commit_every and (idx % commit_every == 0):
-            db.commit()
+            # Nothing to write still records failures in the checkpoint
+            if not writer.flush():
+                checkpoint.save(db)
             print(f"💾 Committed batch at {idx} rows.")
 
-        time.sleep(batch_sleep_seconds)
-
-    db.commit()
+    writer.flush()
+    checkpoint.finish(db)
     db.close()
 
+    updated = len(writer.written)
+
     print("\n🎉 Metadata update complete!")
     print(f"   ✅ Updated: {updated}")
     print(f"   ❌ Failed:  {failed}")
+    print_omdb_cache_stats()
 
 
 if __name__ == "__main__":
-    fetch_and_update_metadata()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fill in missing OMDb metadata for titles")
+    parser.add_argument("--rps", type=float, default=None, help="OMDb requests per second (default: OMDB_REQUESTS_PER_SECOND)")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent OMDb requests (default: OMDB_MAX_WORKERS)")
+    parser.add_argument("--commit-every", type=int, default=200, help="write and commit every N updates (0 = only at the end)")
+
+    args = parser.parse_args()
+
+    configure_omdb_client(requests_per_second=args.rps, max_workers=args.workers)
+    fetch_and_update_metadata(commit_every=args.commit_every)
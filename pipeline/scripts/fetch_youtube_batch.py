@@ -1,70 +1,107 @@
 # fetch_youtube_batch.py
 #
-# Fetches YouTube moments-vibes for up to BATCH_SIZE titles per run.
-# Safe for YouTube API quota: ~101 units per title.
+# Fetches YouTube moments-vibes for as many titles as today's API quota
+# allows. Every call is charged against the daily budget (youtube_quota),
+# and the run stops as soon as the next call would exceed it.
+# Searches, video snippets and comments are cached across runs, and titles
+# that came back empty are skipped for a cooldown period.
 # Run once per day until all titles have YouTube vibes.
 
 from db import SessionLocal
 from sqlalchemy import text
-from fetch_youtube_vibes import fetch_youtube_vibes
+from fetch_youtube_vibes import fetch_youtube_vibes, get_cache, is_cooling_down, mark_empty
+from schema import ensure_schema
+from youtube_quota import UNIT_COSTS, YOUTUBE_DAILY_QUOTA, QuotaExceeded, QuotaPlanner
+from vibe_selection import titles_needing_vibes
 import time
 
-BATCH_SIZE = 100  # safe daily limit
+# Cheapest a title can be: one search plus one videos lookup
+MIN_TITLE_COST = UNIT_COSTS["search"] + UNIT_COSTS["videos"]
 
 
-def fetch_batch():
+def fetch_batch(budget: int = YOUTUBE_DAILY_QUOTA):
+    ensure_schema()
+    reader = SessionLocal()
     db = SessionLocal()
 
-    # 1. Select titles that have NO YouTube raw text yet
-    rows = db.execute(text("""
-        SELECT id, title
-        FROM titles
-        WHERE id NOT IN (
-            SELECT title_id FROM vibe_raw WHERE source = 'youtube'
-        )
-        LIMIT :limit
-    """), {"limit": BATCH_SIZE}).fetchall()
+    quota = QuotaPlanner.load(db, budget)
+    print(f"💳 YouTube quota today: {quota.summary()}")
 
-    total = len(rows)
-    print(f"\n📦 Starting YouTube batch fetch ({total} titles)\n")
-
-    if total == 0:
-        print("🎉 No titles left to fetch!")
+    if not quota.can_afford(MIN_TITLE_COST):
+        print("🛑 Daily YouTube quota already used up.")
+        reader.close()
         db.close()
         return
 
-    for index, row in enumerate(rows, start=1):
-        print(f"\n▶ [{index}/{total}] Fetching: {row.title} (ID {row.id})")
+    print("\n📦 Starting YouTube batch fetch\n")
+
+    # 1. Titles that have NO YouTube raw text yet, best rated / newest first;
+    # how many we get through depends on cache hits and cooldowns
+    index = 0
+    cooling = 0
+    for title_id, title_name in titles_needing_vibes(reader, "youtube"):
+        if not quota.can_afford(MIN_TITLE_COST):
+            print(f"\n🛑 {quota.remaining} units left — not enough for another title.")
+            break
+
+        if is_cooling_down(title_name):
+            cooling += 1
+            continue
+
+        index += 1
+        print(f"\n▶ [{index}] Fetching: {title_name} (ID {title_id})")
 
         # 2. Fetch vibe text
         try:
-            raw_text = fetch_youtube_vibes(row.title)
+            raw_text = fetch_youtube_vibes(title_name, quota=quota)
 
             # Very short text → probably useless → treat as empty
             if len(raw_text.strip()) < 50:
                 print("⚠️ Very little text returned — skipping storing.")
+                mark_empty(title_name)
                 continue
 
             # 3. Save into vibe_raw
             db.execute(text("""
                 INSERT INTO vibe_raw (title_id, source, raw_text, processed)
                 VALUES (:id, 'youtube', :txt, FALSE)
-            """), {"id": row.id, "txt": raw_text})
+            """), {"id": title_id, "txt": raw_text})
 
             db.commit()
             print("✅ Saved")
 
+        except QuotaExceeded as e:
+            print(f"\n🛑 Quota reached mid-title, stopping: {e}")
+            break
+
         except Exception as e:
-            print(f"❌ Error fetching {row.title}: {e}")
+            print(f"❌ Error fetching {title_name}: {e}")
             # YouTube API sometimes throttles — small sleep helps
             time.sleep(2)
 
-        # gentle pacing (optional)
-        time.sleep(0.3)
+        finally:
+            # Persist spend after every title, so a crash can't hide used quota
+            quota.save(db)
 
+    reader.close()
     db.close()
+
+    if index == 0 and cooling == 0 and quota.can_afford(MIN_TITLE_COST):
+        print("🎉 No titles left to fetch!")
+    if cooling:
+        print(f"⏸ Skipped {cooling} titles that recently came back empty")
+    if get_cache() is not None:
+        print(f"🗄️ YouTube cache: {get_cache().summary()}")
+    print(f"\n💳 YouTube quota today: {quota.summary()}")
     print("\n🎉 Batch complete!\n")
 
 
 if __name__ == "__main__":
-    fetch_batch()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch YouTube vibe text within the daily API quota")
+    parser.add_argument("--budget", type=int, default=YOUTUBE_DAILY_QUOTA, help="daily quota units (default: YOUTUBE_DAILY_QUOTA or 10000)")
+
+    args = parser.parse_args()
+
+    fetch_batch(budget=args.budget)
@@ -1,17 +1,110 @@
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
+
+from paths import cache_path
+from response_cache import ResponseCache
+from youtube_quota import QuotaExceeded, QuotaPlanner
 
 load_dotenv()
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-youtube = build(
-    serviceName="youtube",
-    version="v3",
-    developerKey=YOUTUBE_API_KEY,
-    cache_discovery=False
-)
+# Comment threads are fetched concurrently, one request per video
+YOUTUBE_COMMENT_WORKERS = int(os.getenv("YOUTUBE_COMMENT_WORKERS", "8"))
+
+DAY = 24 * 60 * 60
+
+# Paid-for responses are kept in the on-disk response cache. Searches and
+# video snippets barely change; comments are refreshed incrementally.
+SEARCH_TTL = 30 * DAY
+VIDEO_TTL = 30 * DAY
+COMMENTS_TTL = 7 * DAY
+# Titles that yielded (almost) no text are not searched again for a while
+EMPTY_COOLDOWN = 14 * DAY
+# Newest comments kept per video across refreshes
+MAX_COMMENTS_PER_VIDEO = 40
+
+YOUTUBE_CACHE_ENABLED = os.getenv("YOUTUBE_CACHE", "1") != "0"
+
+_local = threading.local()
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """Shared response cache, or None when YOUTUBE_CACHE=0."""
+    global _cache
+    if not YOUTUBE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            # Own file, so the daily workflow can cache it apart from the IMDb dumps
+            _cache = ResponseCache(cache_path("youtube", "responses.sqlite"))
+        return _cache
+
+
+def get_comment_pool() -> ThreadPoolExecutor:
+    """Comment-fetch threads shared by every title in the run, so each
+    thread builds its YouTube client once (see get_youtube)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=YOUTUBE_COMMENT_WORKERS, thread_name_prefix="youtube")
+        return _pool
+
+
+def is_cooling_down(title_name: str) -> bool:
+    """True if `title_name` recently came back without usable text."""
+    cache = get_cache()
+    return cache is not None and cache.get("youtube_empty", {"title": title_name}, max_age=EMPTY_COOLDOWN) is not None
+
+
+def mark_empty(title_name: str) -> None:
+    cache = get_cache()
+    if cache is not None:
+        cache.put("youtube_empty", {"title": title_name}, True, ttl=EMPTY_COOLDOWN)
+
+
+def get_youtube():
+    """YouTube Data API client, built on first use in each thread
+    (the underlying httplib2 connection is not thread-safe)."""
+    client = getattr(_local, "youtube", None)
+    if client is None:
+        from googleapiclient.discovery import build
+
+        client = _local.youtube = build(
+            serviceName="youtube",
+            version="v3",
+            developerKey=YOUTUBE_API_KEY,
+            cache_discovery=False
+        )
+    return client
+
+
+def _error_reasons(e: Exception) -> List[str]:
+    """The `reason` codes of a googleapiclient HttpError (e.g. "commentsDisabled")."""
+    details = getattr(e, "error_details", None)
+    if not isinstance(details, list):
+        # Older clients don't parse the body; read it ourselves
+        try:
+            details = json.loads(getattr(e, "content", b"") or b"{}")["error"]["errors"]
+        except (ValueError, KeyError, TypeError):
+            details = []
+    return [d.get("reason") for d in details if isinstance(d, dict)]
+
+
+def _execute(request, call_type: str, quota: Optional[QuotaPlanner]):
+    """Charge the call to `quota` (raises QuotaExceeded), then run it."""
+    if quota is not None:
+        quota.spend(call_type)
+    return request.execute()
 
 
 SEARCH_QUERIES = [
@@ -22,24 +115,110 @@ SEARCH_QUERIES = [
 ]
 
 
-def youtube_search(query: str, max_results=8):
+def youtube_search(query: str, max_results=8, quota: Optional[QuotaPlanner] = None):
     """Helper that performs a YouTube search and returns video IDs."""
-    response = youtube.search().list(
+    cache = get_cache()
+    params = {"q": query, "max_results": max_results}
+
+    if cache is not None:
+        cached = cache.get("youtube_search", params, max_age=SEARCH_TTL)
+        if cached is not None:
+            return cached
+
+    response = _execute(get_youtube().search().list(
         q=query,
         type="video",
         part="id",
         maxResults=max_results
-    ).execute()
+    ), "search", quota)
+
+    video_ids = [item["id"]["videoId"] for item in response.get("items", [])]
+    if cache is not None:
+        cache.put("youtube_search", params, video_ids)
+    return video_ids
+
+
+def fetch_videos(video_ids: List[str], quota: Optional[QuotaPlanner] = None) -> List[Dict[str, Any]]:
+    """Snippets of `video_ids` (in order, unknown videos dropped); only
+    uncached videos are requested, in a single call."""
+    cache = get_cache()
+    snippets: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    if cache is not None:
+        for video_id in video_ids:
+            cached = cache.get("youtube_video", {"id": video_id}, max_age=VIDEO_TTL)
+            if cached is not None:
+                snippets[video_id] = cached
+
+    missing = [v for v in video_ids if v not in snippets]
+    if missing:
+        videos_response = _execute(get_youtube().videos().list(
+            part="snippet",
+            id=",".join(missing)
+        ), "videos", quota)
+
+        for item in videos_response.get("items", []):
+            snippets[item["id"]] = item["snippet"]
+            if cache is not None:
+                cache.put("youtube_video", {"id": item["id"]}, item["snippet"])
+
+    return [{"id": v, "snippet": snippets[v]} for v in video_ids if snippets.get(v)]
 
-    return [item["id"]["videoId"] for item in response.get("items", [])]
 
+def fetch_comments(video_id: str, quota: Optional[QuotaPlanner] = None) -> List[str]:
+    """Top-level comments of one video ([] if comments are disabled).
 
-def fetch_youtube_vibes(title_name: str) -> str:
+    A stale cached entry is refreshed incrementally: the newest page is
+    fetched and merged in front of the comments we already have.
+    """
+    cache = get_cache()
+    params = {"video_id": video_id}
+    previous: List[str] = []
+
+    if cache is not None:
+        cached = cache.peek("youtube_comments", params)
+        if cached is not None:
+            previous, age = cached
+            if age <= COMMENTS_TTL:
+                return previous
+
+    try:
+        comments_response = _execute(get_youtube().commentThreads().list(
+            part="snippet",
+            videoId=video_id,
+            maxResults=20,
+            order="time",
+            textFormat="plainText"
+        ), "commentThreads", quota)
+    except QuotaExceeded:
+        raise
+    except Exception as e:
+        # Remember that comments are disabled; anything else (quotaExceeded,
+        # forbidden, a bad key, ...) is retried next time
+        if cache is not None and "commentsDisabled" in _error_reasons(e):
+            cache.put("youtube_comments", params, previous)
+        return previous
+
+    latest = [
+        c["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
+        for c in comments_response.get("items", [])
+    ]
+    comments = list(dict.fromkeys(latest + previous))[:MAX_COMMENTS_PER_VIDEO]
+
+    if cache is not None:
+        cache.put("youtube_comments", params, comments)
+    return comments
+
+
+def fetch_youtube_vibes(title_name: str, quota: Optional[QuotaPlanner] = None) -> str:
     """
     Fetch vibe/"tone" text using YouTube Data API based on:
     - "<title> moments"
     - "<title> scenes"
     - "<title> highlights"
+
+    With `quota`, every call is charged first and QuotaExceeded is raised
+    as soon as the next call would go over budget.
     """
 
     video_ids = []
@@ -49,7 +228,7 @@ def fetch_youtube_vibes(title_name: str) -> str:
         query = template.format(title=title_name)
         print(f"🔍 Searching: {query}")
 
-        ids = youtube_search(query)
+        ids = youtube_search(query, quota=quota)
 
         video_ids.extend(ids)
 
@@ -64,39 +243,24 @@ def fetch_youtube_vibes(title_name: str) -> str:
         return ""
 
     # Fetch video metadata
-    videos_response = youtube.videos().list(
-        part="snippet",
-        id=",".join(video_ids)
-    ).execute()
+    items = fetch_videos(video_ids, quota)
+
+    # Comments for all videos at once; results keep video order
+    comments = list(get_comment_pool().map(lambda item: fetch_comments(item["id"], quota), items))
 
     all_text_parts = []
 
-    for item in videos_response.get("items", []):
+    for item, video_comments in zip(items, comments):
         snippet = item["snippet"]
 
         # title, description, tags
         all_text_parts.append(snippet.get("title", ""))
         all_text_parts.append(snippet.get("description", ""))
         all_text_parts.extend(snippet.get("tags", []))
+        all_text_parts.extend(video_comments)
 
-        # Fetch comments
-        try:
-            comments_response = youtube.commentThreads().list(
-                part="snippet",
-                videoId=item["id"],
-                maxResults=20,
-                textFormat="plainText"
-            ).execute()
-
-            for c in comments_response.get("items", []):
-                comment = c["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                all_text_parts.append(comment)
-
-        except Exception:
-            pass  # comments disabled
-
-    # Combine into one large text block
-    combined = " ".join(all_text_parts)
+    # One part per line, so the embedding step can tell parts apart
+    combined = "\n".join(p.strip() for p in all_text_parts if p and p.strip())
     print(f"📦 Combined text length: {len(combined)} characters")
 
     return combined
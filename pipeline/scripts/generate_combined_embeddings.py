@@ -1,118 +1,204 @@
 # generate_combined_embeddings.py
 #
-# Combines plot + YouTube embeddings into a final normalized vector.
-# Reddit is currently disabled (weight = 0.0).
-# Saves result to embeddings.combined_embedding.
+# Combines plot + YouTube (+ Reddit) embeddings into final normalized
+# vectors, one per weight profile (see embedding_profiles.py).
+# The default profile is saved to embeddings.combined_embedding; other
+# profiles go to combined_embeddings.
+#
+# Weights are renormalized over the sources a title actually has, so a
+# missing source never counts as a zero vector.
+#
+# Only rows whose source vectors were written after their last combine, or
+# that were combined with different weights, are recomputed (--full: all).
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from db import SessionLocal
-from sqlalchemy import text
 import numpy as np
-import json
+from sqlalchemy import and_, func, or_, select
 
-# Weight configuration
-PLOT_WEIGHT    = 0.7
-YOUTUBE_WEIGHT = 0.3
-REDDIT_WEIGHT  = 0.0   # Disabled for now
+from db import SessionLocal
+from models import embeddings, combined_embeddings
+from bulk_writer import BulkWriter
+from schema import ensure_schema
+from embedding_profiles import DEFAULT_PROFILE, SOURCES, load_profiles, weights_hash
+import vector_io
 
 VECTOR_DIM = 384
 
+# Titles combined (and written) per pass
+CHUNK_SIZE = 5000
 
-def to_vector(vec):
-    """Convert DB value (pgvector or JSON) into a numpy float vector."""
-    if vec is None:
-        return np.zeros(VECTOR_DIM)
 
-    # If stored as JSON string
-    if isinstance(vec, str):
-        try:
-            vec = json.loads(vec)
-        except json.JSONDecodeError:
-            print("⚠️ JSON decode error, returning zero-vector")
-            return np.zeros(VECTOR_DIM)
+def to_matrix(values: List[Optional[np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack DB vectors into an (N, 384) float32 matrix plus a presence mask.
 
-    arr = np.array(vec, dtype=float)
+    Missing (or malformed) vectors are zero rows marked absent.
+    """
+    matrix = np.zeros((len(values), VECTOR_DIM), dtype=np.float32)
+    present = np.zeros(len(values), dtype=bool)
 
-    # Ensure correct dimension
-    if arr.shape[0] != VECTOR_DIM:
-        print(f"⚠️ Wrong dimensionality ({arr.shape[0]}) — expected {VECTOR_DIM}. Using zero-vector.")
-        return np.zeros(VECTOR_DIM)
+    for i, vec in enumerate(values):
+        if vec is None:
+            continue
+        if len(vec) != VECTOR_DIM:
+            print(f"⚠️ Wrong dimensionality ({len(vec)}) — expected {VECTOR_DIM}. Treating as missing.")
+            continue
+        matrix[i] = vec
+        present[i] = True
+
+    return matrix, present
+
+
+def combine_matrices(
+    matrices: Dict[str, np.ndarray],
+    present: Dict[str, np.ndarray],
+    weights: Dict[str, float],
+) -> np.ndarray:
+    """Weighted sum of the source matrices, each row normalized to unit length.
+
+    Per row, weights are renormalized over the sources that are present.
+    Rows with no weighted source present come back as zero rows.
+    """
+    sources = list(matrices)
+    # (N, S) effective weights: zero where a source is missing
+    w = np.stack([present[s] * weights[s] for s in sources], axis=1).astype(np.float32)
+    total = w.sum(axis=1, keepdims=True)
+    np.divide(w, total, out=w, where=total > 0)
+
+    combined = np.zeros_like(matrices[sources[0]])
+    for j, s in enumerate(sources):
+        combined += w[:, j:j + 1] * matrices[s]
+
+    norms = np.linalg.norm(combined, axis=1, keepdims=True)
+    np.divide(combined, norms, out=combined, where=norms > 0)
+    return combined
+
+
+def dirty_clause(combined_at, stored_hash, current_hash: str):
+    """Rows whose combined vector is missing or out of date."""
+    # GREATEST ignores NULLs, so sources that were never stamped don't count
+    last_input = func.greatest(
+        embeddings.c.plot_updated_at,
+        embeddings.c.youtube_updated_at,
+        embeddings.c.reddit_updated_at,
+    )
+    return or_(
+        combined_at == None,
+        stored_hash.is_distinct_from(current_hash),
+        last_input >= combined_at,
+    )
 
-    return arr
 
+def combine_profile(reader, db, name: str, weights: Dict[str, float], chunk_size: int, full: bool) -> int:
+    """Recompute `name`'s combined vectors for titles that need it."""
+    current_hash = weights_hash(weights)
+    sources = [s for s in SOURCES if weights[s] > 0]
+    columns = [embeddings.c[f"{s}_embedding"] for s in sources]
 
-def normalize(vec):
-    """Normalize combined embedding."""
-    norm = np.linalg.norm(vec)
-    if norm == 0:
-        return vec.tolist()
-    return (vec / norm).tolist()
+    # Stamp with the start of the run: inputs written while we run are
+    # newer and get picked up next time
+    started_at = datetime.now(timezone.utc)
 
+    query = (
+        select(embeddings.c.title_id, *columns)
+        .where(or_(*(c != None for c in columns)))
+        .order_by(embeddings.c.title_id)
+    )
 
-def combine_vectors(plot_vec, yt_vec, reddit_vec):
-    """Weighted linear combination of available vectors."""
+    if name == DEFAULT_PROFILE:
+        stale = dirty_clause(embeddings.c.combined_at, embeddings.c.combined_weights_hash, current_hash)
+        writer = BulkWriter(
+            db, embeddings, "title_id", ["combined_embedding", "combined_at", "combined_weights_hash"],
+            mode="update", batch_size=0,
+        )
 
-    plot = to_vector(plot_vec)
-    yt   = to_vector(yt_vec)
-    rd   = to_vector(reddit_vec)
+        def to_row(title_id, vector):
+            return {
+                "title_id": title_id,
+                "combined_embedding": vector,
+                "combined_at": started_at,
+                "combined_weights_hash": current_hash,
+            }
+    else:
+        query = query.select_from(embeddings.outerjoin(combined_embeddings, and_(
+            combined_embeddings.c.title_id == embeddings.c.title_id,
+            combined_embeddings.c.profile == name,
+        )))
+        stale = dirty_clause(combined_embeddings.c.combined_at, combined_embeddings.c.weights_hash, current_hash)
+        writer = BulkWriter(
+            db, combined_embeddings, ["title_id", "profile"], ["embedding", "combined_at", "weights_hash"],
+            mode="upsert", batch_size=0,
+        )
 
-    # If youtube missing → fallback to only plot
-    if yt_vec is None:
-        yt = np.zeros(VECTOR_DIM)
+        def to_row(title_id, vector):
+            return {
+                "title_id": title_id,
+                "profile": name,
+                "embedding": vector,
+                "combined_at": started_at,
+                "weights_hash": current_hash,
+            }
 
-    combined = (
-            PLOT_WEIGHT    * plot +
-            YOUTUBE_WEIGHT * yt +
-            REDDIT_WEIGHT  * rd
-    )
+    if not full:
+        query = query.where(stale)
 
-    return normalize(combined)
+    combined_count = 0
+    # Vectors are read in binary straight into float32 arrays
+    for rows in vector_io.stream(reader, query, chunk_size):
+        title_ids, *vectors = zip(*rows)
 
+        matrices, present = {}, {}
+        for s, values in zip(sources, vectors):
+            matrices[s], present[s] = to_matrix(values)
 
-def generate_combined_embeddings():
-    db = SessionLocal()
+        combined = combine_matrices(matrices, present, weights)
+        # Rows whose only weighted sources were malformed get nothing
+        ok = np.any(np.stack([present[s] for s in sources], axis=1), axis=1)
 
-    rows = db.execute(text("""
-        SELECT 
-            title_id,
-            plot_embedding,
-            youtube_embedding,
-            reddit_embedding
-        FROM embeddings
-    """)).fetchall()
+        for title_id, vector, keep in zip(title_ids, combined, ok):
+            if keep:
+                writer.add(to_row(title_id, vector))
+        combined_count += len(writer)
+        writer.flush()
 
-    print(f"🔍 Found {len(rows)} embedding rows to combine.\n")
+        print(f"✅ [{name}] Combined embeddings saved for {combined_count} titles")
 
-    for row in rows:
-        if row.plot_embedding is None:
-            print(f"⚠️ Skipping {row.title_id}: missing plot embedding.")
-            continue
+    return combined_count
 
-        final_emb = combine_vectors(
-            row.plot_embedding,
-            row.youtube_embedding,
-            row.reddit_embedding
-        )
 
-        # Sanity check
-        if len(final_emb) != VECTOR_DIM:
-            print(f"❌ ERROR: Combined embedding has wrong dimension for {row.title_id}. Skipping.")
-            continue
+def generate_combined_embeddings(
+    chunk_size: int = CHUNK_SIZE,
+    full: bool = False,
+    profiles: Optional[Sequence[str]] = None,
+):
+    ensure_schema()
 
-        db.execute(
-            text("""
-                UPDATE embeddings 
-                SET combined_embedding = :vec 
-                WHERE title_id = :id
-            """),
-            {"vec": final_emb, "id": row.title_id}
-        )
-        db.commit()
+    all_profiles = load_profiles()
+    selected = profiles or list(all_profiles)
+    unknown = set(selected) - set(all_profiles)
+    if unknown:
+        raise ValueError(f"Unknown embedding profiles: {sorted(unknown)}")
 
-        print(f"✅ Combined embedding saved for title {row.title_id}")
+    reader = SessionLocal()
+    db = SessionLocal()
+
+    for name in selected:
+        count = combine_profile(reader, db, name, all_profiles[name], chunk_size, full)
+        print(f"🎉 [{name}] Combined embeddings up to date! Recomputed {count} titles.")
 
+    reader.close()
     db.close()
-    print("\n🎉 All combined embeddings generated!")
 
 
 if __name__ == "__main__":
-    generate_combined_embeddings()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Combine plot + YouTube embeddings")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="titles combined and written per pass")
+    parser.add_argument("--full", action="store_true", help="recombine every title, not just changed ones")
+    parser.add_argument("--profile", action="append", default=None, help="only combine this profile (repeatable)")
+
+    args = parser.parse_args()
+
+    generate_combined_embeddings(chunk_size=args.chunk_size, full=args.full, profiles=args.profile)
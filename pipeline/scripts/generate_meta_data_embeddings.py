@@ -1,16 +1,16 @@
-from sqlalchemy import select, text
-from db import SessionLocal
-from models import titles
-from sentence_transformers import SentenceTransformer
-import numpy as np
-
-model = SentenceTransformer("all-MiniLM-L6-v2")
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
 
+from sqlalchemy import select
+from db import SessionLocal
+from models import titles, embeddings
+from bulk_writer import BulkWriter
+from schema import ensure_schema
+from embedding_engine import EmbeddingEngine, BACKENDS, MODEL_NAME, ENCODE_BATCH_SIZE, model_tag
 
-def normalize(vec):
-    arr = np.array(vec, dtype=float)
-    norm = np.linalg.norm(arr)
-    return (arr / norm).tolist() if norm > 0 else arr.tolist()
+# Titles read (and written) per round-trip
+CHUNK_SIZE = 1000
 
 
 def build_embedding_text(row):
@@ -25,33 +25,109 @@ def build_embedding_text(row):
     ).strip()
 
 
-def generate_all_embeddings():
-    db = SessionLocal()
+def text_hash(text_content: str) -> str:
+    return hashlib.sha256(text_content.encode("utf-8")).hexdigest()
+
+
+def _pending_batches(result, chunk_size: int, full: bool, tag: str, stats: dict):
+    """Yield ([(title_id, digest), ...], texts) for titles that need encoding."""
+    pending = []
+    # Rows written before plot_model named the backend were all torch
+    same_model = {tag, MODEL_NAME} if tag == model_tag(MODEL_NAME, "torch") else {tag}
+
+    for rows in result.partitions(chunk_size):
+        stats["seen"] += len(rows)
 
-    rows = db.execute(select(titles)).fetchall()
-    print(f"📝 Titles found: {len(rows)}")
+        for row in rows:
+            text_content = build_embedding_text(row)
+            digest = text_hash(text_content)
+            if full or row.missing or row.plot_text_hash != digest or row.plot_model not in same_model:
+                pending.append((row.id, text_content, digest))
 
-    for row in rows:
-        text_content = build_embedding_text(row)
+        # Changed titles are sparse in incremental runs; encode full chunks only
+        if len(pending) >= chunk_size:
+            yield [(i, d) for i, _, d in pending], [t for _, t, _ in pending]
+            pending = []
 
-        vector = model.encode(text_content)
-        vector = normalize(vector)
+    if pending:
+        yield [(i, d) for i, _, d in pending], [t for _, t, _ in pending]
 
-        sql = text("""
-            INSERT INTO embeddings (title_id, plot_embedding)
-            VALUES (:id, :vec)
-            ON CONFLICT (title_id)
-            DO UPDATE SET plot_embedding = EXCLUDED.plot_embedding
-        """)
 
-        db.execute(sql, {"id": row.id, "vec": vector})
+def generate_all_embeddings(
+    chunk_size: int = CHUNK_SIZE,
+    batch_size: int = ENCODE_BATCH_SIZE,
+    full: bool = False,
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+):
+    """Embed titles whose plot text or model changed since the last run.
 
-        print(f"✨ Saved plot embedding for: {row.title}")
+    Every run still reads all titles (cheap), but only titles without a
+    plot_embedding, or whose build_embedding_text() hash / model and backend
+    (model_tag) differ from what is stored, are encoded. full=True
+    re-encodes everything.
 
-    db.commit()
+    Chunks are encoded by EmbeddingEngine worker processes while the next
+    chunks are read; all writes happen here through one BulkWriter.
+    """
+    ensure_schema()
+
+    reader = SessionLocal()
+    db = SessionLocal()
+
+    # Stream titles with a server-side cursor; writes go through a second
+    # session so per-chunk commits don't close the cursor.
+    result = reader.execute(
+        select(
+            titles.c.id, titles.c.title, titles.c.year, titles.c.type, titles.c.genres, titles.c.plot,
+            embeddings.c.plot_text_hash,
+            embeddings.c.plot_model,
+            (embeddings.c.plot_embedding == None).label("missing"),
+        )
+        .select_from(titles.outerjoin(embeddings, embeddings.c.title_id == titles.c.id))
+        .order_by(titles.c.id)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+
+    writer = BulkWriter(
+        db, embeddings, "title_id", ["plot_embedding", "plot_text_hash", "plot_model", "plot_updated_at"],
+        mode="upsert", batch_size=0,
+    )
+    stats = {"seen": 0}
+    encoded = 0
+
+    with EmbeddingEngine(MODEL_NAME, workers=workers, batch_size=batch_size, backend=backend) as engine:
+        tag = model_tag(MODEL_NAME, engine.backend)
+        for keys, vectors in engine.imap(_pending_batches(result, chunk_size, full, tag, stats)):
+            now = datetime.now(timezone.utc)
+            for (title_id, digest), vector in zip(keys, vectors):
+                writer.add({
+                    "title_id": title_id,
+                    "plot_embedding": vector,
+                    "plot_text_hash": digest,
+                    "plot_model": tag,
+                    "plot_updated_at": now,
+                })
+            writer.flush()
+
+            encoded += len(keys)
+            print(f"✨ Saved plot embeddings for {encoded} titles ({stats['seen']} checked)")
+
+    reader.close()
     db.close()
-    print("🎉 Plot embedding generation complete!")
+    print(f"🎉 Plot embedding generation complete! Encoded {encoded} of {stats['seen']} titles.")
 
 
 if __name__ == "__main__":
-    generate_all_embeddings()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate plot embeddings for new or changed titles")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="titles read and written per round-trip")
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE, help="texts per model forward pass")
+    parser.add_argument("--full", action="store_true", help="re-encode every title, not just new/changed ones")
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (default: EMBEDDING_WORKERS or all cores)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=None, help="inference backend (default: EMBEDDING_BACKEND or torch)")
+
+    args = parser.parse_args()
+
+    generate_all_embeddings(chunk_size=args.chunk_size, batch_size=args.batch_size, full=args.full, workers=args.workers, backend=args.backend)
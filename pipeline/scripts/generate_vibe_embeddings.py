@@ -1,92 +1,145 @@
-from db import SessionLocal
-from sentence_transformers import SentenceTransformer
-from sqlalchemy import text
-import numpy as np
-
-# Load embedding model once
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-
-def normalize(vec):
-    """Ensure embedding is unit-normalized (required for cosine distance)."""
-    arr = np.array(vec, dtype=float)
-    norm = np.linalg.norm(arr)
-    return (arr / norm).tolist() if norm > 0 else arr.tolist()
-
-
-def get_latest_raw_text(db, title_id: int, source: str):
-    """Fetch the most recent raw text from vibe_raw for YouTube or Reddit."""
-    row = db.execute(
-        text("""
-            SELECT raw_text
-            FROM vibe_raw
-            WHERE title_id = :id AND source = :source
-            ORDER BY fetched_at DESC
-            LIMIT 1
-        """),
-        {"id": title_id, "source": source}
-    ).fetchone()
-
-    if row:
-        raw = row[0]
-        if raw and raw.strip():
-            return raw
-
-    return None
-
-
-def embed_text(text_block: str):
-    """Convert raw text -> normalized MiniLM embedding."""
-    vec = model.encode(text_block)
-    return normalize(vec)
-
+# generate_vibe_embeddings.py
+#
+# Embeds the latest unprocessed YouTube vibe text per title and marks the
+# vibe_raw rows it covered as processed, so the next run only sees titles
+# with newly fetched text.
+#
+# Each blob is cleaned and split into model-sized chunks (vibe_text); the
+# title's vector is the normalized mean of its chunk vectors. A blob with
+# nothing usable left after cleaning is reported and left unprocessed.
+
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
 
-def save_embedding(db, title_id: int, column: str, embedding):
-    """Write embedding into the correct column in embeddings table."""
-
-    # Ensure row exists in embeddings
-    db.execute(
-        text("""
-            INSERT INTO embeddings (title_id)
-            VALUES (:id)
-            ON CONFLICT (title_id) DO NOTHING
-        """),
-        {"id": title_id}
-    )
+import numpy as np
 
-    # Update embedding column
-    db.execute(
-        text(f"UPDATE embeddings SET {column} = :emb WHERE title_id = :id"),
-        {"emb": embedding, "id": title_id},
+from db import SessionLocal
+from sqlalchemy import ARRAY, DateTime, Integer, bindparam, text
+from models import embeddings
+from bulk_writer import BulkWriter
+from schema import ensure_schema
+from embedding_engine import EmbeddingEngine, BACKENDS, MODEL_NAME, ENCODE_BATCH_SIZE
+from vibe_text import chunk_vibe_text, mean_pool
+
+# Titles encoded (and written) per engine batch
+CHUNK_SIZE = 256
+
+# Newest unprocessed row per title; one streamed query instead of one per title
+LATEST_UNPROCESSED_SQL = text("""
+    SELECT DISTINCT ON (title_id) title_id, raw_text, fetched_at
+    FROM vibe_raw
+    WHERE source = :source AND NOT processed
+    ORDER BY title_id, fetched_at DESC
+""")
+
+# Everything up to the row we embedded is covered by it
+MARK_PROCESSED_SQL = text("""
+    UPDATE vibe_raw AS v
+    SET processed = TRUE
+    FROM unnest(:title_ids, :fetched_at) AS d(title_id, fetched_at)
+    WHERE v.title_id = d.title_id
+      AND v.source = :source
+      AND NOT v.processed
+      AND v.fetched_at <= d.fetched_at
+""").bindparams(
+    bindparam("title_ids", type_=ARRAY(Integer)),
+    bindparam("fetched_at", type_=ARRAY(DateTime(timezone=True))),
+)
+
+Seen = List[Tuple[int, datetime]]
+
+
+def _vibe_batches(
+    reader, source: str, chunk_size: int,
+) -> Iterator[Tuple[Tuple[List[int], np.ndarray, Seen, List[int]], List[str]]]:
+    """Yield ((title_ids, owners, seen, empty), chunks) per batch of unprocessed titles.
+
+    `owners[i]` is the index into `title_ids` of the title chunk i came
+    from. Titles with nothing left to embed after cleaning are listed in
+    `empty` instead of `seen`: their rows stay unprocessed.
+    """
+    result = reader.execute(
+        LATEST_UNPROCESSED_SQL.execution_options(stream_results=True, yield_per=chunk_size),
+        {"source": source},
     )
 
-    db.commit()
-
-
-def generate_vibe_embeddings():
+    for rows in result.partitions(chunk_size):
+        ids, owners, seen, empty, chunks = [], [], [], [], []
+        for title_id, raw_text, fetched_at in rows:
+            title_chunks = chunk_vibe_text(raw_text or "")
+            if not title_chunks:
+                empty.append(title_id)
+                continue
+            owners.extend([len(ids)] * len(title_chunks))
+            ids.append(title_id)
+            seen.append((title_id, fetched_at))
+            chunks.extend(title_chunks)
+
+        yield (ids, np.array(owners, dtype=np.intp), seen, empty), chunks
+
+
+def mark_processed(db, source: str, seen: Seen) -> None:
+    """Mark `seen` titles' rows processed (committed with the next flush)."""
+    if not seen:
+        return
+
+    title_ids, fetched_at = zip(*seen)
+    db.execute(MARK_PROCESSED_SQL, {
+        "title_ids": list(title_ids),
+        "fetched_at": list(fetched_at),
+        "source": source,
+    })
+
+
+def generate_vibe_embeddings(
+    chunk_size: int = CHUNK_SIZE,
+    batch_size: int = ENCODE_BATCH_SIZE,
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+):
+    ensure_schema()
+    reader = SessionLocal()
     db = SessionLocal()
 
-    # Fetch all titles
-    title_rows = db.execute(
-        text("SELECT id, title FROM titles")
-    ).fetchall()
+    # Engine output is already unit-normalized (required for cosine distance)
+    writer = BulkWriter(db, embeddings, "title_id", ["youtube_embedding", "youtube_updated_at"], mode="upsert", batch_size=0)
+    saved = 0
+    skipped: List[int] = []
 
-    for title_id, title_name in title_rows:
-        print(f"\n🎨 Generating vibe embeddings for: {title_name} (ID {title_id})")
+    with EmbeddingEngine(MODEL_NAME, workers=workers, batch_size=batch_size, backend=backend) as engine:
+        for (title_ids, owners, seen, empty), chunk_vectors in engine.imap(_vibe_batches(reader, "youtube", chunk_size)):
+            vectors = mean_pool(chunk_vectors, owners, len(title_ids))
 
-        # ---- YouTube ----
-        youtube_text = get_latest_raw_text(db, title_id, "youtube")
+            now = datetime.now(timezone.utc)
+            for title_id, vector in zip(title_ids, vectors):
+                writer.add({"title_id": title_id, "youtube_embedding": vector, "youtube_updated_at": now})
 
-        if youtube_text:
-            yt_emb = embed_text(youtube_text)
-            save_embedding(db, title_id, "youtube_embedding", yt_emb)
-            print("   ✔ YouTube embedding saved")
-        else:
-            print("   ⚠ No YouTube raw text found")
+            # Same transaction as the embeddings: a failed run leaves rows unprocessed
+            mark_processed(db, "youtube", seen)
+            writer.flush()
+            db.commit()
 
+            saved += len(title_ids)
+            skipped.extend(empty)
+            print(f"✔ YouTube embeddings saved for {saved} titles")
+
+    reader.close()
     db.close()
+
+    if skipped:
+        print(f"⚠ {len(skipped)} titles had no usable YouTube raw text, left unprocessed: {skipped[:20]}")
     print("\n🎉 All vibe embeddings generated!")
 
 
 if __name__ == "__main__":
-    generate_vibe_embeddings()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate YouTube vibe embeddings")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="titles encoded and written per batch")
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE, help="text chunks per model forward pass")
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (default: EMBEDDING_WORKERS or all cores)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=None, help="inference backend (default: EMBEDDING_BACKEND or torch)")
+
+    args = parser.parse_args()
+
+    generate_vibe_embeddings(chunk_size=args.chunk_size, batch_size=args.batch_size, workers=args.workers, backend=args.backend)
@@ -0,0 +1,49 @@
+# http_client.py
+#
+# One pooled requests.Session per process, shared by the OMDb client and the
+# IMDb dump downloader, so repeated calls reuse keep-alive TCP/TLS connections
+# instead of opening a new one per request.
+
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Distinct hosts kept in the pool (OMDb, IMDb datasets, ...)
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "4"))
+# Max open connections per host; callers block rather than exceed it
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "16"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_POOL_PER_HOST,
+        pool_block=True,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+        "User-Agent": "what-to-watch-next-pipeline",
+    })
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled HTTP session."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
@@ -0,0 +1,170 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import requests
+from pyarrow import csv
+
+from http_client import get_session
+from paths import cache_path
+
+BASICS_URL = "https://datasets.imdbws.com/title.basics.tsv.gz"
+RATINGS_URL = "https://datasets.imdbws.com/title.ratings.tsv.gz"
+
+TITLE_TYPES = ("movie", "tvSeries", "tvMiniSeries")
+
+CHUNK_SIZE = 1024 * 1024
+# Uncompressed bytes per parsed batch; bounds peak memory while reading dumps.
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def _load_validators(meta_file: str) -> Dict[str, str]:
+    try:
+        with open(meta_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_validators(meta_file: str, response: requests.Response) -> None:
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    with open(meta_file, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in validators.items() if v}, f)
+
+
+def download_file(url: str, filename: str, timeout: int = 60) -> bool:
+    """Stream `url` to `filename` in chunks.
+
+    Sends If-None-Match / If-Modified-Since from the previous download so an
+    unchanged dump is not fetched again, and resumes an interrupted download
+    from `<filename>.part` with a Range request.
+
+    Returns True if new content was written, False if the local copy was
+    already up to date.
+    """
+    part_file = filename + ".part"
+    meta_file = filename + ".meta.json"
+    validators = _load_validators(meta_file)
+
+    headers: Dict[str, str] = {}
+    if os.path.exists(filename):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    part_validator = _load_validators(part_file + ".meta.json")
+    if offset and (part_validator.get("etag") or part_validator.get("last_modified")):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = part_validator.get("etag") or part_validator["last_modified"]
+    else:
+        offset = 0
+
+    with get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            print(f"✔ {os.path.basename(filename)} unchanged since last download")
+            return False
+
+        if response.status_code == 416:
+            # Stale partial file (e.g. the dump was replaced); start over
+            os.remove(part_file)
+            return download_file(url, filename, timeout=timeout)
+
+        response.raise_for_status()
+
+        if response.status_code == 206:
+            print(f"⏩ Resuming {os.path.basename(filename)} at {offset} bytes")
+            mode = "ab"
+        else:
+            mode = "wb"
+            _save_validators(part_file + ".meta.json", response)
+
+        with open(part_file, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+
+        os.replace(part_file, filename)
+        os.replace(part_file + ".meta.json", meta_file)
+
+    print(f"⬇ Downloaded {os.path.basename(filename)}")
+    return True
+
+
+def download_dumps(basics_file: Optional[str] = None, ratings_file: Optional[str] = None) -> Tuple[str, str]:
+    """Make sure the IMDb basics + ratings dumps are present and current.
+
+    Returns (basics_path, ratings_path).
+    """
+    basics_file = basics_file or cache_path("imdb", "title.basics.tsv.gz")
+    ratings_file = ratings_file or cache_path("imdb", "title.ratings.tsv.gz")
+
+    download_file(BASICS_URL, basics_file)
+    download_file(RATINGS_URL, ratings_file)
+
+    return basics_file, ratings_file
+
+
+def read_tsv_batches(filename: str, columns: Dict[str, pa.DataType], block_size: int = BLOCK_SIZE) -> Iterator[pa.RecordBatch]:
+    """Stream an IMDb .tsv.gz dump as Arrow record batches.
+
+    Only `columns` are materialized, already converted to the given types;
+    IMDb's `\\N` placeholder becomes null.
+    """
+    reader = csv.open_csv(
+        filename,
+        read_options=csv.ReadOptions(block_size=block_size),
+        parse_options=csv.ParseOptions(
+            delimiter="\t",
+            quote_char=False,
+            invalid_row_handler=lambda row: "skip",
+        ),
+        convert_options=csv.ConvertOptions(
+            include_columns=list(columns),
+            column_types=columns,
+            null_values=["\\N"],
+            strings_can_be_null=True,
+        ),
+    )
+    with reader:
+        for batch in reader:
+            yield batch
+
+
+def tconst_to_int(tconsts: pa.Array) -> pa.Array:
+    """Convert tconst strings such as "tt0111161" to ints, vectorized."""
+    return pc.cast(pc.utf8_slice_codeunits(tconsts, 2), pa.int64())
+
+
+def int_to_tconst(values: Iterable[int]) -> List[str]:
+    return [f"tt{int(v):07d}" for v in values]
+
+
+def read_ratings(ratings_file: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All of title.ratings as (int tconst, rating, votes) arrays, in dump order."""
+    tconsts, ratings, votes = [], [], []
+    columns = {"tconst": pa.string(), "averageRating": pa.float32(), "numVotes": pa.int64()}
+
+    for batch in read_tsv_batches(ratings_file, columns):
+        tconsts.append(tconst_to_int(batch.column("tconst")).to_numpy())
+        ratings.append(pc.fill_null(batch.column("averageRating"), 0.0).to_numpy())
+        votes.append(pc.fill_null(batch.column("numVotes"), 0).to_numpy())
+
+    if not tconsts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    return np.concatenate(tconsts), np.concatenate(ratings), np.concatenate(votes)
+
+
+def basics_batches(basics_file: str) -> Iterator[Tuple[np.ndarray, pa.Array, pa.Array]]:
+    """Stream title.basics as (int tconst, titleType, startYear) per batch."""
+    columns = {"tconst": pa.string(), "titleType": pa.string(), "startYear": pa.int32()}
+
+    for batch in read_tsv_batches(basics_file, columns):
+        yield tconst_to_int(batch.column("tconst")).to_numpy(), batch.column("titleType"), batch.column("startYear")
@@ -0,0 +1,144 @@
+# imdb_index.py
+#
+# Builds a compact, memory-mappable snapshot of the IMDb dumps:
+# one fixed-width record per rated title, sorted by numeric tconst.
+# The week/month/year importers query this instead of re-parsing
+# title.basics.tsv.gz and title.ratings.tsv.gz on every run; filtering by
+# votes, rating, type and year happens here (query_index), reading the
+# dumps in imdb_dumps.
+
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from imdb_dumps import TITLE_TYPES, basics_batches, download_dumps, int_to_tconst, read_ratings
+from paths import cache_path
+
+INDEX_DTYPE = np.dtype([
+    ("tconst", "<u4"),
+    ("rating", "<f4"),
+    ("votes", "<u4"),
+    ("type", "u1"),
+    ("start_year", "<i2"),   # 0 = unknown
+])
+
+# Code 0 is reserved for "not in basics / unknown type"
+TYPE_NAMES = [
+    "movie", "short", "tvSeries", "tvEpisode", "tvMovie", "tvMiniSeries",
+    "tvSpecial", "tvShort", "tvPilot", "video", "videoGame",
+]
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES, start=1)}
+
+
+def default_index_file() -> str:
+    return cache_path("imdb", "title.index.npy")
+
+
+def build_index(basics_file: str, ratings_file: str, index_file: Optional[str] = None) -> str:
+    """Join ratings + basics into a sorted structured array and save it as .npy."""
+    index_file = index_file or default_index_file()
+
+    tconsts, ratings, votes = read_ratings(ratings_file)
+    index = np.zeros(len(tconsts), dtype=INDEX_DTYPE)
+    index["tconst"] = tconsts
+    index["rating"] = ratings
+    index["votes"] = votes
+    index.sort(order="tconst")
+
+    type_names = pa.array(TYPE_NAMES, type=pa.string())
+
+    # An empty (e.g. truncated) ratings dump gives an empty index
+    for numeric, title_types, start_years in (basics_batches(basics_file) if len(index) else ()):
+        pos, found = find(index, numeric)
+        if not found.any():
+            continue
+
+        codes = pc.fill_null(pc.add(pc.index_in(title_types, value_set=type_names), 1), 0)
+        years = pc.fill_null(start_years, 0)
+
+        index["type"][pos[found]] = codes.to_numpy()[found]
+        index["start_year"][pos[found]] = years.to_numpy()[found]
+
+    tmp_file = index_file + ".tmp.npy"
+    np.save(tmp_file, index)
+    os.replace(tmp_file, index_file)
+
+    with open(index_file + ".meta.json", "w", encoding="utf-8") as f:
+        json.dump({"basics": os.path.getmtime(basics_file), "ratings": os.path.getmtime(ratings_file)}, f)
+
+    print(f"🗂 Built IMDb index with {len(index)} rated titles")
+    return index_file
+
+
+def _index_is_current(index_file: str, basics_file: str, ratings_file: str) -> bool:
+    try:
+        with open(index_file + ".meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    return (
+        os.path.exists(index_file)
+        and meta.get("basics") == os.path.getmtime(basics_file)
+        and meta.get("ratings") == os.path.getmtime(ratings_file)
+    )
+
+
+def load_index(index_file: Optional[str] = None) -> np.ndarray:
+    """Memory-map a previously built index (read-only)."""
+    return np.load(index_file or default_index_file(), mmap_mode="r")
+
+
+def ensure_index(index_file: Optional[str] = None) -> np.ndarray:
+    """Refresh the dumps, rebuild the index only if they changed, and map it."""
+    index_file = index_file or default_index_file()
+    basics_file, ratings_file = download_dumps()
+
+    if not _index_is_current(index_file, basics_file, ratings_file):
+        build_index(basics_file, ratings_file, index_file)
+
+    return load_index(index_file)
+
+
+def find(index: np.ndarray, tconsts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of int `tconsts` in `index`, and which of them it has.
+
+    Positions where found is False are meaningless (0).
+    """
+    keys = index["tconst"]
+    if len(keys) == 0:
+        return np.zeros(len(tconsts), dtype=np.intp), np.zeros(len(tconsts), dtype=bool)
+
+    pos = np.searchsorted(keys, tconsts)
+    pos[pos == len(keys)] = 0
+    return pos, keys[pos] == tconsts
+
+
+def query_index(
+    index: np.ndarray,
+    min_votes: int = 0,
+    min_rating: float = 0.0,
+    title_types: Sequence[str] = TITLE_TYPES,
+    start_year: Optional[int] = None,
+    min_start_year: Optional[int] = None,
+) -> List[str]:
+    """Return IMDb ids ("tt...") matching the filters, in tconst order."""
+    codes = [TYPE_CODES[t] for t in title_types if t in TYPE_CODES]
+
+    mask = (index["votes"] >= min_votes) & (index["rating"] >= np.float32(min_rating))
+    mask &= np.isin(index["type"], codes)
+    if start_year is not None:
+        mask &= index["start_year"] == start_year
+    if min_start_year is not None:
+        mask &= index["start_year"] >= min_start_year
+
+    return int_to_tconst(index["tconst"][mask])
+
+
+if __name__ == "__main__":
+    basics, ratings = download_dumps()
+    build_index(basics, ratings)
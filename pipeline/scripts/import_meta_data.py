@@ -1,103 +1,146 @@
 import os
 import sys
-import time
-from typing import List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
+from sqlalchemy import Text, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from db import SessionLocal
 from models import titles
-from fetch_metadata import fetch_and_parse_omdb
+from bulk_writer import BulkWriter
+from fetch_metadata import fetch_and_parse_many, missing_metadata_clause, print_omdb_cache_stats
 
 load_dotenv()
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")
 
 
-def insert_title_if_missing(db, imdb_id: str) -> str:
-    existing = db.execute(
-        titles.select().where(titles.c.imdb_id == imdb_id)
-    ).fetchone()
-
-    if existing:
-        print(f"↩ Skipping {imdb_id}, already in DB (id={existing.id})")
-        return "skipped"
-
-    meta = fetch_and_parse_omdb(imdb_id)
+TITLE_COLUMNS = [
+    "imdb_id", "title", "year", "release_date", "plot", "type", "genres",
+    "directors", "writers", "producers", "imdb_rating", "actors", "poster_url",
+]
+
+
+@dataclass
+class ImportPlan:
+    """What an import will do with each IMDb id, decided up front."""
+    insert: List[str] = field(default_factory=list)
+    skip: List[str] = field(default_factory=list)
+    # Already in DB but missing OMDb-backed fields (see missing_metadata_clause)
+    refresh: List[str] = field(default_factory=list)
+
+
+def plan_import(db, imdb_ids: List[str]) -> ImportPlan:
+    """Split `imdb_ids` into insert / skip / refresh with a single query."""
+    unique_ids = list(dict.fromkeys(imdb_ids))
+    plan = ImportPlan()
+    if not unique_ids:
+        return plan
+
+    ids_param = bindparam("ids", unique_ids, type_=ARRAY(Text))
+    existing = {
+        row.imdb_id: row.incomplete
+        for row in db.execute(
+            select(titles.c.imdb_id, missing_metadata_clause().label("incomplete"))
+            .where(titles.c.imdb_id == any_(ids_param))
+        )
+    }
+
+    for imdb_id in unique_ids:
+        if imdb_id not in existing:
+            plan.insert.append(imdb_id)
+        elif existing[imdb_id]:
+            plan.refresh.append(imdb_id)
+        else:
+            plan.skip.append(imdb_id)
+
+    return plan
+
+
+def title_row(imdb_id: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Map parsed OMDb metadata to a `titles` row."""
+    return {
+        "imdb_id": imdb_id,
+        "title": meta.get("title"),
+        "year": meta.get("year"),
+        # release_date is expected to be a datetime.date or datetime.datetime
+        "release_date": meta.get("release_date"),
+        "plot": meta.get("plot"),
+        "type": meta.get("type"),
+        "genres": meta.get("genres") or None,
+        "directors": meta.get("directors") or None,
+        "writers": meta.get("writers") or None,
+        "producers": meta.get("producers") or None,
+        "imdb_rating": meta.get("imdb_rating"),
+        "actors": meta.get("actors") or None,
+        "poster_url": meta.get("poster_url"),
+    }
+
+
+def insert_title(writer: BulkWriter, imdb_id: str, meta: Optional[Dict[str, Any]]) -> str:
+    """Stage one title on `writer`; rows reach the DB when the writer flushes."""
     if not meta:
         print(f"❌ No OMDb data for {imdb_id}")
         return "failed"
 
-    title_name = meta.get("title")
-    year = meta.get("year")
-    plot = meta.get("plot")
-    type_value = meta.get("type")
-
-    # release_date is expected to be a datetime.date or datetime.datetime
-    release_obj = meta.get("release_date")
-    release_iso = release_obj.isoformat() if release_obj else None
-
-    genres_list = meta.get("genres")
-    directors_list = meta.get("directors")
-    writers_list = meta.get("writers")
-    producers_list = meta.get("producers")
-    imdb_rating = meta.get("imdb_rating")
-    actors_2 = meta.get("actors")
-    poster_url = meta.get("poster_url")
-
-    insert_stmt = titles.insert().values(
-        imdb_id=imdb_id,
-        title=title_name,
-        year=year,
-        release_date=release_iso,
-        plot=plot,
-        type=type_value,
-        genres=genres_list or None,
-        directors=directors_list or None,
-        writers=writers_list or None,
-        producers=producers_list or None,
-        imdb_rating=imdb_rating,
-        actors=actors_2,
-        poster_url=poster_url,
-    )
-
-    db.execute(insert_stmt)
-    print(f"✔ Inserted {imdb_id} - {title_name}")
-    return "inserted"
-
-
-def import_imdb_ids(
-    imdb_ids: List[str],
-    batch_sleep_seconds: float = 0.2,
-) -> None:
+    if not meta.get("title"):
+        print(f"❌ OMDb returned no title for {imdb_id}")
+        return "failed"
+
+    writer.add(title_row(imdb_id, meta))
+    print(f"✔ Staged {imdb_id} - {meta.get('title')}")
+    return "staged"
+
+
+def import_imdb_ids(imdb_ids: List[str], commit_every: int = 200, refresh_incomplete: bool = False) -> List[str]:
+    """Insert OMDb metadata for ids not yet in `titles`.
+
+    With refresh_incomplete=True, titles already in the DB but missing
+    metadata are re-fetched too; only their empty fields are filled in.
+
+    Returns the inserted IMDb ids.
+    """
     print(f"🧾 Got {len(imdb_ids)} IMDb ids to process")
 
     db = SessionLocal()
 
-    inserted = 0
-    skipped = 0
-    failed = 0
+    plan = plan_import(db, imdb_ids)
+    refresh = plan.refresh if refresh_incomplete else []
+    skipped = len(plan.skip) + len(plan.refresh) - len(refresh)
+    print(f"📋 Plan: {len(plan.insert)} to insert, {len(refresh)} to refresh, {skipped} to skip")
 
-    for idx, imdb_id in enumerate(imdb_ids, start=1):
-        print(f"\n({idx}/{len(imdb_ids)}) Processing {imdb_id}")
-        result = insert_title_if_missing(db, imdb_id)
+    inserts = BulkWriter(db, titles, "imdb_id", TITLE_COLUMNS, mode="insert", batch_size=commit_every)
+    refreshes = BulkWriter(db, titles, "imdb_id", TITLE_COLUMNS, mode="update", batch_size=commit_every, fill_only=True)
+    staged = 0
+    failed = 0
 
-        if result == "inserted":
-            inserted += 1
-        elif result == "skipped":
-            skipped += 1
+    work = plan.insert + refresh
+    refresh_set = set(refresh)
+    for idx, (imdb_id, meta) in enumerate(fetch_and_parse_many(work), start=1):
+        print(f"\n({idx}/{len(work)}) Processing {imdb_id}")
+        writer = refreshes if imdb_id in refresh_set else inserts
+        if insert_title(writer, imdb_id, meta) == "staged":
+            staged += 1
         else:
             failed += 1
 
-        if batch_sleep_seconds:
-            time.sleep(batch_sleep_seconds)
-
-    db.commit()
+    inserts.flush()
+    refreshes.flush()
     db.close()
 
+    inserted = len(inserts.written)
+    # Staged rows that hit ON CONFLICT were inserted concurrently by someone else
+    skipped += staged - inserted - len(refreshes.written)
+
     print("\n🎉 Import complete!")
     print(f"   ✅ Inserted: {inserted}")
+    print(f"   🔄 Refreshed: {len(refreshes.written)}")
     print(f"   ↩ Skipped (already in DB): {skipped}")
     print(f"   ❌ Failed: {failed}")
+    print_omdb_cache_stats()
+
+    return inserts.written
 
 
 if __name__ == "__main__":
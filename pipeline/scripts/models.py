@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, Text, ARRAY, ForeignKey, Float, Date
+from sqlalchemy import Table, Column, Integer, Text, ARRAY, ForeignKey, Float, Date, DateTime, Identity
 from sqlalchemy.orm import registry
 from pgvector.sqlalchemy import Vector
 from db import metadata
@@ -21,7 +21,11 @@ titles = Table(
     Column("poster_url", Text),
     Column("imdb_rating", Float),
     Column("actors", ARRAY(Text)),
-    Column("release_date", Date, nullable=True)
+    Column("release_date", Date, nullable=True),
+    # Rating refresh schedule (see rating_refresh)
+    Column("imdb_votes", Integer),
+    Column("last_refreshed_at", DateTime(timezone=True)),
+    Column("next_refresh_at", DateTime(timezone=True))
 )
 
 embeddings = Table(
@@ -31,5 +35,72 @@ embeddings = Table(
     Column("plot_embedding", Vector(384)),
     Column("youtube_embedding", Vector(384)),
     Column("reddit_embedding", Vector(384)),
-    Column("combined_embedding", Vector(384))
+    Column("combined_embedding", Vector(384)),
+    # What plot_embedding was computed from (see generate_meta_data_embeddings)
+    Column("plot_text_hash", Text),
+    Column("plot_model", Text),
+    # Change tracking: when each source vector was last written, and which
+    # inputs/weights combined_embedding was built from
+    Column("plot_updated_at", DateTime(timezone=True)),
+    Column("youtube_updated_at", DateTime(timezone=True)),
+    Column("reddit_updated_at", DateTime(timezone=True)),
+    Column("combined_at", DateTime(timezone=True)),
+    Column("combined_weights_hash", Text)
+)
+
+# Combined vectors for non-default weight profiles (embedding_profiles.json).
+# The default profile lives in embeddings.combined_embedding, which the
+# backend reads.
+combined_embeddings = Table(
+    "combined_embeddings",
+    metadata,
+    Column("title_id", Integer, ForeignKey("titles.id"), primary_key=True),
+    Column("profile", Text, primary_key=True),
+    Column("embedding", Vector(384)),
+    Column("combined_at", DateTime(timezone=True)),
+    Column("weights_hash", Text)
+)
+
+# Pipeline bookkeeping: OMDb `Released` lookups already done during discovery
+release_date_checks = Table(
+    "release_date_checks",
+    metadata,
+    Column("imdb_id", Text, primary_key=True),
+    Column("release_date", Date, nullable=True),
+    Column("checked_at", DateTime(timezone=True), nullable=False)
+)
+
+
+# YouTube Data API units spent per (Pacific) day and call type
+youtube_quota_usage = Table(
+    "youtube_quota_usage",
+    metadata,
+    Column("day", Date, primary_key=True),
+    Column("call_type", Text, primary_key=True),
+    Column("calls", Integer, nullable=False),
+    Column("units", Integer, nullable=False)
+)
+
+# Checkpoints: one row per job run, plus the items it has finished, so a
+# crashed run can be resumed without repeating external calls
+pipeline_runs = Table(
+    "pipeline_runs",
+    metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column("job", Text, nullable=False),
+    Column("params_hash", Text, nullable=False),
+    Column("status", Text, nullable=False),
+    Column("started_at", DateTime(timezone=True), nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+    Column("finished_at", DateTime(timezone=True)),
+    Column("items_done", Integer, nullable=False, default=0),
+    Column("last_offset", Integer, nullable=False, default=0)
+)
+
+pipeline_run_items = Table(
+    "pipeline_run_items",
+    metadata,
+    Column("run_id", Integer, ForeignKey("pipeline_runs.id", ondelete="CASCADE"), primary_key=True),
+    Column("item", Text, primary_key=True),
+    Column("status", Text, nullable=False)
 )
\ No newline at end of file
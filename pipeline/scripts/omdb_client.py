@@ -0,0 +1,234 @@
+# omdb_client.py
+#
+# Thread-pool OMDb client shared by every pipeline script.
+# A global token bucket caps requests per second across all worker
+# threads, so callers can submit as much work as they like and run at
+# the configured quota instead of sleeping between calls.
+#
+# Raw responses are kept in the on-disk response cache. How stale a cached
+# response may be depends on the fields the caller needs: ratings go stale
+# quickly, plot and credits hardly ever change.
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+from http_client import get_session
+from response_cache import ResponseCache
+
+load_dotenv()
+
+OMDB_URL = "http://www.omdbapi.com/"
+
+OMDB_REQUESTS_PER_SECOND = float(os.getenv("OMDB_REQUESTS_PER_SECOND", "5"))
+OMDB_MAX_WORKERS = int(os.getenv("OMDB_MAX_WORKERS", "8"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Max age of a cached response, per OMDb field the caller relies on
+FIELD_TTLS = {
+    "imdbRating": 1 * DAY,
+    "imdbVotes": 1 * DAY,
+    "Metascore": 1 * DAY,
+    "Ratings": 1 * DAY,
+    "Released": 7 * DAY,
+    "Poster": 30 * DAY,
+    "Title": 90 * DAY,
+    "Year": 90 * DAY,
+    "Type": 90 * DAY,
+    "Genre": 90 * DAY,
+    "Plot": 90 * DAY,
+    "Director": 90 * DAY,
+    "Writer": 90 * DAY,
+    "Actors": 90 * DAY,
+    "Production": 90 * DAY,
+}
+# "No such title" answers; new titles show up on OMDb after a while.
+# Other errors (e.g. "Request limit reached!") are never cached.
+NOT_FOUND_TTL = 1 * DAY
+NOT_FOUND_ERRORS = {"Incorrect IMDb ID.", "Movie not found!"}
+# The API key's daily quota is used up; nothing will succeed until tomorrow
+LIMIT_ERRORS = {"Request limit reached!"}
+
+OMDB_CACHE_ENABLED = os.getenv("OMDB_CACHE", "1") != "0"
+
+
+def ttl_for(fields: Optional[Sequence[str]]) -> float:
+    """Strictest TTL among `fields` (all known fields when None)."""
+    fields = fields or FIELD_TTLS.keys()
+    return min(FIELD_TTLS.get(f, min(FIELD_TTLS.values())) for f in fields)
+
+
+def _error_body(resp: requests.Response) -> Optional[Dict[str, Any]]:
+    """OMDb's {"Response": "False", "Error": ...} body of a 4xx response, if any."""
+    try:
+        data = resp.json()
+    except ValueError:
+        return None
+    if isinstance(data, dict) and data.get("Response") == "False":
+        return data
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class OmdbClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        requests_per_second: float = OMDB_REQUESTS_PER_SECOND,
+        max_workers: int = OMDB_MAX_WORKERS,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.api_key = api_key or os.getenv("OMDB_API_KEY")
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache if cache is not None else (ResponseCache() if OMDB_CACHE_ENABLED else None)
+
+    def fetch(
+        self,
+        imdb_id: str,
+        fields: Optional[Sequence[str]] = None,
+        errors: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch raw OMDb JSON for one title, or None if OMDb has no data.
+
+        `fields` names the OMDb fields the caller needs; it decides how old a
+        cached response may be (see FIELD_TTLS). With errors=True, OMDb's own
+        error answers ({"Response": "False", "Error": ...}) are returned
+        too, and None only means the request itself failed.
+        """
+        query = {"i": imdb_id, "r": "json", "plot": "full"}
+
+        data = None
+        if self.cache is not None:
+            data = self.cache.get("omdb", query, max_age=ttl_for(fields))
+
+        if data is None:
+            data = self._request(query)
+            if not data:
+                return None
+
+            if self.cache is not None:
+                if data.get("Response") == "True":
+                    self.cache.put("omdb", query, data)
+                elif data.get("Error") in NOT_FOUND_ERRORS:
+                    self.cache.put("omdb", query, data, ttl=NOT_FOUND_TTL)
+
+        return data if errors or data.get("Response") == "True" else None
+
+    def _request(self, query: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """GET OMDb with rate limiting and retries; None on repeated failure.
+
+        4xx answers are not retried; OMDb's JSON error body is returned.
+        """
+        if not self.api_key:
+            raise RuntimeError("OMDB_API_KEY not set in environment")
+
+        params = {**query, "apikey": self.api_key}
+        for attempt in range(1, self.retries + 1):
+            self.bucket.acquire()
+            try:
+                resp = get_session().get(OMDB_URL, params=params, timeout=10)
+                if resp.status_code in RETRY_STATUS:
+                    raise requests.HTTPError(f"HTTP {resp.status_code}", response=resp)
+                if 400 <= resp.status_code < 500:
+                    # OMDb answers errors such as "Request limit reached!" or
+                    # "Invalid API key!" with a 401 and a JSON body; retrying
+                    # won't change them, so hand the answer to the caller
+                    return _error_body(resp)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception:
+                if attempt < self.retries:
+                    # Exponential backoff with jitter so workers don't retry in lockstep
+                    time.sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+                    continue
+                return None
+
+    def fetch_many(
+        self,
+        imdb_ids: Iterable[str],
+        fields: Optional[Sequence[str]] = None,
+        errors: bool = False,
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Yield (imdb_id, raw) in input order, fetching concurrently (see fetch).
+
+        At most 2 * max_workers requests are in flight, so this is safe to
+        use on arbitrarily long id lists.
+        """
+        ids = iter(imdb_ids)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = deque(
+                (imdb_id, pool.submit(self.fetch, imdb_id, fields, errors))
+                for imdb_id in islice(ids, self.max_workers * 2)
+            )
+            while pending:
+                imdb_id, future = pending.popleft()
+                next_id = next(ids, None)
+                if next_id is not None:
+                    pending.append((next_id, pool.submit(self.fetch, next_id, fields, errors)))
+                yield imdb_id, future.result()
+
+
+_client: Optional[OmdbClient] = None
+_client_lock = threading.Lock()
+
+
+def get_omdb_client() -> OmdbClient:
+    """Process-wide client, so every caller shares one rate limit."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OmdbClient()
+        return _client
+
+
+def configure_omdb_client(requests_per_second: Optional[float] = None, max_workers: Optional[int] = None) -> OmdbClient:
+    """Replace the shared client, e.g. from a script's --rps / --workers flags."""
+    global _client
+    with _client_lock:
+        _client = OmdbClient(
+            requests_per_second=requests_per_second or OMDB_REQUESTS_PER_SECOND,
+            max_workers=max_workers or OMDB_MAX_WORKERS,
+        )
+        return _client
@@ -0,0 +1,16 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Local working directory for downloaded dumps and other pipeline caches.
+# The GitHub workflows persist this directory between runs with actions/cache.
+CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR", ".pipeline_cache")
+
+
+def cache_path(*parts: str) -> str:
+    """Return a path inside CACHE_DIR, creating parent directories as needed."""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,118 @@
+# rating_refresh.py
+#
+# Decides when a title's IMDb rating is worth fetching again.
+#
+# Ratings of new releases move daily while those of old films barely move,
+# so each title gets its own refresh interval: a base interval from its
+# age, shortened when its vote count grew a lot since the last refresh and
+# stretched when it hardly grew. The interval is stored as
+# titles.next_refresh_at, so picking the titles that are due is one
+# indexed query.
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from models import titles
+
+# Columns a refresh writes (titles, keyed on imdb_id)
+REFRESH_COLUMNS = ["imdb_rating", "imdb_votes", "last_refreshed_at", "next_refresh_at"]
+
+# (max age in days, base interval in days), first match wins. Intervals
+# are only as fine as the update_ratings workflow's (daily) schedule.
+AGE_TIERS = [
+    (30, 1),
+    (180, 7),
+    (2 * 365, 30),
+]
+OLD_TITLE_INTERVAL = 180
+# Age to assume when neither release date nor year is known
+UNKNOWN_AGE_DAYS = 365
+
+# Relative vote growth since the last refresh
+VOLATILE_GROWTH = 0.10
+STABLE_GROWTH = 0.01
+
+MIN_INTERVAL = timedelta(days=1)
+MAX_INTERVAL = timedelta(days=365)
+# Titles OMDb does not know are retried after this long; transient
+# failures keep their schedule instead
+FAILED_RETRY = timedelta(days=30)
+
+
+def title_age_days(release_date: Optional[date], year: Optional[int], today: date) -> int:
+    if release_date is None and year:
+        release_date = date(year, 1, 1)
+    if release_date is None:
+        return UNKNOWN_AGE_DAYS
+    return max(0, (today - release_date).days)
+
+
+def refresh_interval(
+    release_date: Optional[date],
+    year: Optional[int],
+    old_votes: Optional[int],
+    new_votes: Optional[int],
+    today: date,
+) -> timedelta:
+    age = title_age_days(release_date, year, today)
+    days = next((interval for max_age, interval in AGE_TIERS if age <= max_age), OLD_TITLE_INTERVAL)
+    interval = timedelta(days=days)
+
+    # Without two vote counts there is nothing to measure; keep the base
+    if old_votes and new_votes is not None:
+        growth = (new_votes - old_votes) / old_votes
+        if growth >= VOLATILE_GROWTH:
+            interval /= 2
+        elif growth < STABLE_GROWTH:
+            interval *= 2
+
+    return min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
+
+
+def next_refresh(row, new_votes: Optional[int], now: datetime) -> datetime:
+    """When to refresh `row` (a titles row) again after refreshing it `now`."""
+    return now + refresh_interval(row.release_date, row.year, row.imdb_votes, new_votes, now.date())
+
+
+def due_titles(db, now: datetime, limit: Optional[int] = None, full: bool = False) -> List:
+    """Titles whose rating is due for a refresh, most overdue (or never refreshed) first.
+
+    With full=True every title with an imdb_id is returned.
+    """
+    stmt = (
+        select(
+            titles.c.id, titles.c.imdb_id, titles.c.year, titles.c.release_date,
+            titles.c.imdb_rating, titles.c.imdb_votes, titles.c.last_refreshed_at,
+        )
+        .where(titles.c.imdb_id != None)
+        .order_by(titles.c.next_refresh_at.asc().nulls_first(), titles.c.id)
+    )
+    if not full:
+        stmt = stmt.where((titles.c.next_refresh_at == None) | (titles.c.next_refresh_at <= now))
+    if limit:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).fetchall()
+
+
+def rating_row(row, rating: Optional[float], votes: Optional[int], now: datetime) -> dict:
+    """REFRESH_COLUMNS update for `row` refreshed `now` with `rating` / `votes`."""
+    return {
+        "imdb_id": row.imdb_id,
+        "imdb_rating": rating,
+        "imdb_votes": votes if votes is not None else row.imdb_votes,
+        "last_refreshed_at": now,
+        "next_refresh_at": next_refresh(row, votes, now),
+    }
+
+
+def retry_row(row, now: datetime) -> dict:
+    """REFRESH_COLUMNS update for a title OMDb does not know: keep everything, try again later."""
+    return {
+        "imdb_id": row.imdb_id,
+        "imdb_rating": row.imdb_rating,
+        "imdb_votes": row.imdb_votes,
+        "last_refreshed_at": row.last_refreshed_at,
+        "next_refresh_at": now + FAILED_RETRY,
+    }
@@ -0,0 +1,122 @@
+# recent_titles.py
+#
+# Shared discovery for the weekly/monthly importers: which rated IMDb
+# titles were released within the last N days?
+#
+# 1. The IMDb snapshot index narrows candidates by rating, votes, type
+#    and startYear (no network).
+# 2. OMDb `Released` is only looked up for candidates we have not checked
+#    before; every OMDb answer is stored in `release_date_checks`. Failed
+#    lookups are not, so the next run retries them. A dry run reads the
+#    stored checks but writes nothing, not even the schema.
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect, select
+
+from bulk_writer import BulkWriter
+from db import SessionLocal
+from fetch_metadata import parse_release_date
+from imdb_index import ensure_index, query_index
+from models import release_date_checks
+from omdb_client import NOT_FOUND_ERRORS, get_omdb_client
+from schema import ensure_schema
+
+# OMDb `Released` is often the US release, which can trail IMDb's startYear
+START_YEAR_SLACK = 1
+
+# Titles OMDb had no release date for are re-checked after this many days
+UNKNOWN_RECHECK_DAYS = 7
+
+SAVE_EVERY = 200
+
+
+def _load_checks(db, imdb_ids: List[str]) -> Dict[str, tuple]:
+    if not imdb_ids:
+        return {}
+    # A dry run before the first real one finds no table yet
+    if not inspect(db.get_bind()).has_table(release_date_checks.name):
+        return {}
+
+    rows = db.execute(
+        select(release_date_checks).where(release_date_checks.c.imdb_id.in_(imdb_ids))
+    ).fetchall()
+
+    return {row.imdb_id: (row.release_date, row.checked_at) for row in rows}
+
+
+def _save_checks(db, checks: Dict[str, Optional[date]]) -> None:
+    if not checks:
+        return
+
+    now = datetime.now(timezone.utc)
+    with BulkWriter(db, release_date_checks, "imdb_id", ["release_date", "checked_at"], batch_size=0) as writer:
+        for imdb_id, release_date in checks.items():
+            writer.add({"imdb_id": imdb_id, "release_date": release_date, "checked_at": now})
+
+
+def discover_recent_ids(days: int, min_votes: int, min_rating: float, dry_run: bool = False) -> List[str]:
+    """Return IMDb ids released on or after today - `days`.
+
+    With dry_run=True the release dates looked up on OMDb are not stored.
+    """
+    cutoff = date.today() - timedelta(days=days)
+
+    index = ensure_index()
+    candidates = query_index(
+        index,
+        min_votes=min_votes,
+        min_rating=min_rating,
+        min_start_year=cutoff.year - START_YEAR_SLACK,
+    )
+    print(f"🔎 {len(candidates)} rated candidates with startYear >= {cutoff.year - START_YEAR_SLACK}")
+
+    if not dry_run:
+        ensure_schema()
+    db = SessionLocal()
+
+    known = _load_checks(db, candidates)
+    recheck_before = datetime.now(timezone.utc) - timedelta(days=UNKNOWN_RECHECK_DAYS)
+
+    ids: List[str] = []
+    to_check: List[str] = []
+
+    for imdb_id in candidates:
+        release_date, checked_at = known.get(imdb_id, (None, None))
+        if release_date is not None:
+            # A known release date never needs another lookup: if it is
+            # before today's cutoff it will be before every later cutoff too.
+            if release_date >= cutoff:
+                ids.append(imdb_id)
+        elif checked_at is None or checked_at < recheck_before:
+            to_check.append(imdb_id)
+
+    print(f"📡 Looking up {len(to_check)} release dates on OMDb ({len(candidates) - len(to_check)} cached)")
+
+    checks: Dict[str, Optional[date]] = {}
+    failed = 0
+    for imdb_id, data in get_omdb_client().fetch_many(to_check, fields=("Released",), errors=True):
+        # Only an answer is worth remembering; errors and limits are retried next run
+        if not data or (data.get("Response") != "True" and data.get("Error") not in NOT_FOUND_ERRORS):
+            failed += 1
+            continue
+
+        release_date = parse_release_date(data.get("Released"))
+        checks[imdb_id] = release_date
+
+        if release_date and release_date >= cutoff:
+            ids.append(imdb_id)
+
+        if len(checks) >= SAVE_EVERY and not dry_run:
+            _save_checks(db, checks)
+            checks = {}
+
+    if not dry_run:
+        _save_checks(db, checks)
+    db.close()
+
+    if failed:
+        print(f"⚠ {failed} release date lookups failed; they are retried next run")
+
+    return sorted(ids)
@@ -0,0 +1,142 @@
+# response_cache.py
+#
+# Small on-disk cache for external API responses (SQLite).
+#
+# Entries are content-addressed: the key is a hash of the namespace and the
+# request parameters. Freshness is decided by the caller at read time
+# (`max_age`), so one stored response can serve callers with different
+# staleness needs; an entry may also carry its own upper bound (`ttl`).
+# Total size is capped with least-recently-used eviction.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from paths import cache_path
+
+load_dotenv()
+
+CACHE_MAX_BYTES = int(float(os.getenv("RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# After eviction the cache is trimmed to this fraction of the cap
+EVICT_TO = 0.9
+
+
+def cache_key(namespace: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{namespace}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path or cache_path("responses.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                namespace   TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                fetched_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                ttl         REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, namespace: str, params: Dict[str, Any], max_age: float) -> Optional[Any]:
+        """Return the cached value if it is younger than `max_age` seconds
+        (and than the entry's own ttl, if it was stored with one)."""
+        key = cache_key(namespace, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at, ttl FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, fetched_at, ttl = row
+            if now - fetched_at > min(max_age, ttl if ttl is not None else max_age):
+                self.stale += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return json.loads(value)
+
+    def peek(self, namespace: str, params: Dict[str, Any]) -> Optional[Tuple[Any, float]]:
+        """Return (value, age in seconds) regardless of freshness, or None.
+
+        For callers that refresh an entry incrementally from its old value.
+        Does not count as a hit or miss.
+        """
+        key = cache_key(namespace, params)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, namespace: str, params: Dict[str, Any], value: Any, ttl: Optional[float] = None) -> None:
+        key = cache_key(namespace, params)
+        payload = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, value, size, fetched_at, accessed_at, ttl) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, payload, len(payload), now, now, ttl),
+            )
+            self._size += len(payload) - (old[0] if old else 0)
+
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * EVICT_TO)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+
+            doomed = []
+            for key, size in rows:
+                if self._size <= target:
+                    break
+                doomed.append((key,))
+                self._size -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "bytes": self._size}
+
+    def summary(self) -> str:
+        s = self.stats()
+        return f"{s['hits']} hits, {s['misses']} misses, {s['stale']} stale, {s['bytes'] / 1024 / 1024:.1f} MiB"
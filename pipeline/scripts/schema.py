@@ -0,0 +1,61 @@
+# schema.py
+#
+# Idempotent DDL for the tables and columns the pipeline owns.
+# Safe to run at the start of every job.
+
+from sqlalchemy import inspect, text
+
+from db import get_engine, metadata
+from models import release_date_checks, combined_embeddings, youtube_quota_usage, pipeline_runs, pipeline_run_items
+
+# (table, column, type) added to tables the backend also reads
+COLUMNS = [
+    ("embeddings", "plot_text_hash", "TEXT"),
+    ("embeddings", "plot_model", "TEXT"),
+    ("embeddings", "plot_updated_at", "TIMESTAMPTZ"),
+    ("embeddings", "youtube_updated_at", "TIMESTAMPTZ"),
+    ("embeddings", "reddit_updated_at", "TIMESTAMPTZ"),
+    ("embeddings", "combined_at", "TIMESTAMPTZ"),
+    ("embeddings", "combined_weights_hash", "TEXT"),
+    ("titles", "imdb_votes", "INTEGER"),
+    ("titles", "last_refreshed_at", "TIMESTAMPTZ"),
+    ("titles", "next_refresh_at", "TIMESTAMPTZ"),
+]
+
+# (index, table, columns) on tables the pipeline queries heavily
+INDEXES = [
+    ("vibe_raw_source_title_id_idx", "vibe_raw", "(source, title_id)"),
+    ("titles_next_refresh_at_idx", "titles", "(next_refresh_at NULLS FIRST)"),
+    # vibe_selection's sort key, expression for expression
+    (
+        "titles_vibe_priority_idx", "titles",
+        "((COALESCE(imdb_rating, -1)), (COALESCE(release_date, DATE '0001-01-01')), (-id))",
+    ),
+]
+
+
+def ensure_schema():
+    engine = get_engine()
+    metadata.create_all(
+        engine,
+        tables=[release_date_checks, combined_embeddings, youtube_quota_usage, pipeline_runs, pipeline_run_items],
+        checkfirst=True,
+    )
+
+    # ALTER TABLE / CREATE INDEX lock the table even when there is nothing
+    # to do, so only issue them for columns and indexes that are missing
+    inspector = inspect(engine)
+    existing = {t: {c["name"] for c in inspector.get_columns(t)} for t in {t for t, _, _ in COLUMNS}}
+    missing = [(t, c, type_) for t, c, type_ in COLUMNS if c not in existing[t]]
+
+    indexed = {t: {i["name"] for i in inspector.get_indexes(t)} for t in {t for _, t, _ in INDEXES}}
+    missing_indexes = [(name, t, cols) for name, t, cols in INDEXES if name not in indexed[t]]
+
+    if not missing and not missing_indexes:
+        return
+
+    with engine.begin() as conn:
+        for table, column, type_ in missing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {type_}"))
+        for name, table, columns in missing_indexes:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}"))
@@ -1,33 +1,80 @@
-import time
+from datetime import datetime, timezone
 from typing import Tuple
 
+import numpy as np
+
 from db import SessionLocal
 from models import titles
-from fetch_metadata import fetch_and_parse_omdb
-
-
-def update_all_ratings(batch_sleep_seconds: float = 0.2, commit_every: int = 100, dry_run: bool = False) -> Tuple[int, int]:
-    """Update `imdb_rating` for all rows with an `imdb_id`.
-
-    Returns (updated_count, failed_count).
+from bulk_writer import BulkWriter
+from checkpoints import FAILED, Checkpoint
+from fetch_metadata import omdb_error, parse_omdb, print_omdb_cache_stats
+from omdb_client import LIMIT_ERRORS, NOT_FOUND_ERRORS, configure_omdb_client, get_omdb_client
+from rating_refresh import REFRESH_COLUMNS, due_titles, rating_row, retry_row
+from schema import ensure_schema
+
+# OMDb requests per run; titles not reached stay due for the next run
+DEFAULT_BUDGET = 1000
+
+
+def update_all_ratings(
+    commit_every: int = 100,
+    dry_run: bool = False,
+    budget: int = DEFAULT_BUDGET,
+    full: bool = False,
+) -> Tuple[int, int]:
+    """Refresh `imdb_rating` from OMDb for titles that are due (see rating_refresh).
+
+    At most `budget` titles are fetched (0 = no limit); with full=True every
+    title with an `imdb_id` is, regardless of its schedule.
+
+    Titles OMDb does not know are retried after FAILED_RETRY; titles hit by
+    a transient error keep their schedule, so they stay due. The run stops
+    early once the OMDb key's daily limit is reached.
+
+    Returns (updated_count, failed_count). An interrupted run is resumed
+    by the next one (see checkpoints.py); dry runs are not checkpointed.
     """
+    ensure_schema()
     db = SessionLocal()
-    stmt = titles.select().where(titles.c.imdb_id != None)
-    rows = db.execute(stmt).fetchall()
+    now = datetime.now(timezone.utc)
+    rows = due_titles(db, now, limit=budget, full=full)
+    print(f"🗓 {len(rows)} titles due for a rating refresh (budget {budget or 'unlimited'})")
 
+    checkpoint = None
+    if not dry_run:
+        checkpoint = Checkpoint.start(db, "update_ratings", {"budget": budget, "full": full})
+        pending = set(checkpoint.pending(row.imdb_id for row in rows))
+        rows = [row for row in rows if row.imdb_id in pending]
+
+    by_id = {row.imdb_id: row for row in rows}
     updated = 0
     failed = 0
 
-    for idx, row in enumerate(rows, start=1):
-        imdb_id = row.imdb_id
-        if not imdb_id:
-            continue
+    writer = BulkWriter(
+        db, titles, "imdb_id", REFRESH_COLUMNS, mode="update", batch_size=0,
+        on_flush=checkpoint.on_flush if checkpoint else None,
+    )
+
+    fetched = get_omdb_client().fetch_many(list(by_id), fields=("imdbRating", "imdbVotes"), errors=True)
+
+    for idx, (imdb_id, raw) in enumerate(fetched, start=1):
+        row = by_id[imdb_id]
+        error = omdb_error(raw)
 
-        meta = fetch_and_parse_omdb(imdb_id)
+        if error in LIMIT_ERRORS:
+            print(f"🛑 OMDb limit reached at {imdb_id}; the rest stay due for the next run")
+            break
+
+        meta = parse_omdb(raw) if not error else None
         if not meta:
-            print(f"❌ Failed to fetch OMDb for {imdb_id}")
+            print(f"❌ Failed to fetch OMDb for {imdb_id}" + (f": {error}" if error else ""))
             failed += 1
-            time.sleep(batch_sleep_seconds)
+            # Only an answer that OMDb has no such title is worth a long
+            # back-off; transient failures stay unmarked, so a resumed run
+            # retries them
+            if checkpoint and error in NOT_FOUND_ERRORS:
+                checkpoint.mark(imdb_id, FAILED)
+                writer.add(retry_row(row, now))
             continue
 
         imdb_rating = meta.get("imdb_rating")
@@ -40,47 +87,91 @@ def update_all_ratings(batch_sleep_seconds: float = 0.2, commit_every: int = 100
         if dry_run:
             print(f"DRY: {imdb_id} -> {imdb_rating}")
         else:
-            try:
-                db.execute(
-                    titles.update()
-                    .where(titles.c.imdb_id == imdb_id)
-                    .values(imdb_rating=imdb_rating)
-                )
-                updated += 1
-            except Exception as e:
-                print(f"❌ DB update failed for {imdb_id}: {e}")
-                failed += 1
-
-        if commit_every and (idx % commit_every == 0):
-            db.commit()
+            checkpoint.mark(imdb_id)
+            writer.add(rating_row(row, imdb_rating, meta.get("imdb_votes"), now))
+            updated += 1
+
+        if commit_every and (idx % commit_every == 0) and not dry_run:
+            # Nothing to write still records failures in the checkpoint
+            if not writer.flush():
+                checkpoint.save(db)
             print(f"💾 Committed batch at {idx} rows.")
 
-        time.sleep(batch_sleep_seconds)
-
     if not dry_run:
-        db.commit()
+        writer.flush()
+        checkpoint.finish(db)
     db.close()
 
     print(f"\nDone. Updated: {updated}, Failed: {failed}")
+    print_omdb_cache_stats()
     return updated, failed
 
 
+def update_ratings_from_imdb(commit_every: int = 5000, dry_run: bool = False) -> Tuple[int, int]:
+    """Refresh ratings and vote counts of the whole catalog from the IMDb dumps.
+
+    One bulk pass over title.ratings.tsv.gz (via the imdb_index snapshot),
+    no OMDb calls. Titles the dump has no rating for are left due, so the
+    OMDb pass picks them up.
+
+    Returns (updated_count, missing_count).
+    """
+    from imdb_index import ensure_index, find
+
+    ensure_schema()
+    index = ensure_index()
+
+    db = SessionLocal()
+    now = datetime.now(timezone.utc)
+    rows = due_titles(db, now, full=True)
+
+    numeric = np.array([int(row.imdb_id[2:]) if row.imdb_id[2:].isdigit() else 0 for row in rows], dtype=np.int64)
+    pos, found = find(index, numeric)
+    print(f"🗂 {int(found.sum())} of {len(rows)} titles rated in the IMDb dump")
+
+    if dry_run:
+        db.close()
+        return int(found.sum()), len(rows) - int(found.sum())
+
+    with BulkWriter(db, titles, "imdb_id", REFRESH_COLUMNS, mode="update", batch_size=commit_every) as writer:
+        for row, i in zip((r for r, f in zip(rows, found) if f), pos[found]):
+            record = index[i]
+            # The dump stores one decimal as float32; round back to it
+            rating = round(float(record["rating"]), 1)
+            writer.add(rating_row(row, rating, int(record["votes"]), now))
+
+    db.close()
+    updated = len(writer.written)
+    print(f"\nDone. Updated from IMDb dump: {updated}, not in dump: {len(rows) - updated}")
+    return updated, len(rows) - updated
+
+
 if __name__ == "__main__":
     import argparse
     import sys
 
-    parser = argparse.ArgumentParser(description="Update imdb_rating for all titles using OMDb")
-    parser.add_argument("--sleep", type=float, dest="batch_sleep_seconds", default=0.2, help="delay between OMDb requests")
-    parser.add_argument("--commit-every", type=int, default=100, help="commit every N updates (0 = never)")
+    parser = argparse.ArgumentParser(description="Refresh imdb_rating for titles that are due, from OMDb or the IMDb dumps")
+    parser.add_argument("--source", choices=["omdb", "imdb"], default="omdb", help="omdb: due titles within --budget; imdb: whole catalog from the IMDb ratings dump")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help=f"max OMDb requests per run (0 = no limit, default: {DEFAULT_BUDGET})")
+    parser.add_argument("--full", action="store_true", help="refresh every title from OMDb, not just those due")
+    parser.add_argument("--rps", type=float, default=None, help="OMDb requests per second (default: OMDB_REQUESTS_PER_SECOND)")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent OMDb requests (default: OMDB_MAX_WORKERS)")
+    parser.add_argument("--commit-every", type=int, default=100, help="write and commit every N updates (0 = only at the end)")
     parser.add_argument("--dry-run", action="store_true", help="only fetch ratings and print, do not write to DB")
 
     args = parser.parse_args()
 
-    updated, failed = update_all_ratings(
-        batch_sleep_seconds=args.batch_sleep_seconds,
-        commit_every=args.commit_every,
-        dry_run=args.dry_run,
-    )
+    if args.source == "imdb":
+        updated, failed = update_ratings_from_imdb(dry_run=args.dry_run)
+    else:
+        configure_omdb_client(requests_per_second=args.rps, max_workers=args.workers)
+
+        updated, failed = update_all_ratings(
+            commit_every=args.commit_every,
+            dry_run=args.dry_run,
+            budget=args.budget,
+            full=args.full,
+        )
 
     if updated or failed:
         sys.exit(0)
@@ -0,0 +1,115 @@
+# vector_io.py
+#
+# Binary pgvector transfer between NumPy and Postgres (psycopg 3).
+#
+# pgvector's binary format is a big-endian header (dim, unused: uint16)
+# followed by `dim` big-endian float32s. Vectors are decoded straight into
+# float32 arrays and encoded from them with a single byteswap, instead of
+# going through Python lists and "[0.1,0.2,...]" text literals.
+#
+# Adapters are registered per cursor, so SQLAlchemy statements on the same
+# connection keep their usual behaviour.
+
+import struct
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from psycopg.adapt import Dumper, Loader
+from psycopg.pq import Format
+from psycopg.types import TypeInfo
+
+_HEADER = struct.Struct(">HH")
+_BE_FLOAT32 = np.dtype(">f4")
+
+_vector_oid: Optional[int] = None
+
+
+class VectorBinaryLoader(Loader):
+    format = Format.BINARY
+
+    def load(self, data) -> np.ndarray:
+        dim, _ = _HEADER.unpack_from(data)
+        return np.frombuffer(data, dtype=_BE_FLOAT32, count=dim, offset=_HEADER.size).astype(np.float32)
+
+
+class VectorBinaryDumper(Dumper):
+    format = Format.BINARY
+
+    def dump(self, obj) -> bytes:
+        values = np.asarray(obj, dtype=_BE_FLOAT32)
+        return _HEADER.pack(values.shape[0], 0) + values.tobytes()
+
+
+def raw_connection(db):
+    """The psycopg connection behind a SQLAlchemy session."""
+    return db.connection().connection.driver_connection
+
+
+def vector_oid(conn) -> int:
+    global _vector_oid
+    if _vector_oid is None:
+        info = TypeInfo.fetch(conn, "vector")
+        if info is None:
+            raise RuntimeError("pgvector 'vector' type not found in the database")
+        _vector_oid = info.oid
+    return _vector_oid
+
+
+def register(cursor) -> None:
+    """Read and write `vector` values on `cursor` as float32 NumPy arrays."""
+    oid = vector_oid(cursor.connection)
+    cursor.adapters.register_loader(oid, VectorBinaryLoader)
+    cursor.adapters.register_dumper(np.ndarray, type("VectorBinaryDumper", (VectorBinaryDumper,), {"oid": oid}))
+
+
+def binary_cursor(db, name: Optional[str] = None):
+    """A binary-format cursor on `db`'s connection with vector adapters.
+
+    Pass `name` for a server-side cursor (streaming large results).
+    """
+    conn = raw_connection(db)
+    cursor = conn.cursor(name=name, binary=True) if name else conn.cursor(binary=True)
+    register(cursor)
+    return cursor
+
+
+def stream(db, query, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+    """Run a SQLAlchemy Core `query` and yield its rows in chunks.
+
+    Vector columns arrive as float32 arrays; other columns as psycopg's
+    usual Python types. Rows are plain tuples.
+    """
+    compiled = query.compile(dialect=db.get_bind().dialect)
+    cursor = binary_cursor(db, name=f"vector_io_{id(query):x}")
+    cursor.itersize = chunk_size
+    try:
+        cursor.execute(str(compiled), compiled.params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def column_oids(db, table: str, columns: Sequence[str]) -> List[int]:
+    """Type OIDs of `columns` of `table`, in the given order."""
+    with raw_connection(db).cursor() as cursor:
+        cursor.execute(
+            "SELECT attname, atttypid FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+            (table,),
+        )
+        types = dict(cursor.fetchall())
+    return [types[c] for c in columns]
+
+
+def copy_rows(db, table: str, columns: Sequence[str], types: Sequence[int], rows: Iterable[Sequence[Any]]) -> None:
+    """Binary COPY `rows` into `table`; `types` are the columns' OIDs."""
+    cols = ", ".join(columns)
+    with binary_cursor(db) as cursor:
+        with cursor.copy(f"COPY {table} ({cols}) FROM STDIN (FORMAT BINARY)") as copy:
+            copy.set_types(types)
+            for row in rows:
+                copy.write_row(row)
@@ -0,0 +1,71 @@
+# vibe_selection.py
+#
+# Picks the titles that still need vibe text, most valuable first.
+#
+# "Needs vibes" is an anti-join (NOT EXISTS) against vibe_raw, backed by
+# the (source, title_id) index from schema.py. That anti-join is also what
+# tracks progress across runs: a title drops out once its text is stored,
+# so every run simply starts again from the top.
+#
+# Titles are ordered by IMDb rating, then release date (newest first),
+# then id. The sort key matches the titles_vibe_priority_idx expression
+# index, so a page is a backward index scan that stops after `limit`
+# hits. Within a run pages are read with keyset pagination: each one
+# starts right after the last key of the previous page, so titles that
+# were skipped (cooldown, errors) are not read again.
+
+from typing import Iterator, Tuple
+
+from sqlalchemy import text
+
+PAGE_SIZE = 100
+
+# Must match the titles_vibe_priority_idx expressions in schema.py
+# exactly. NULL ratings/dates sort last; -id turns "id ASC" into the same
+# direction as the other keys, so one row comparison expresses "after".
+_SORT_KEY = "COALESCE(t.imdb_rating, -1), COALESCE(t.release_date, DATE '0001-01-01'), -t.id"
+
+_PAGE_SQL = f"""
+    SELECT
+        t.id,
+        t.title,
+        COALESCE(t.imdb_rating, -1) AS rating_key,
+        COALESCE(t.release_date, DATE '0001-01-01') AS date_key
+    FROM titles t
+    WHERE NOT EXISTS (
+        SELECT 1 FROM vibe_raw v
+        WHERE v.source = :source AND v.title_id = t.id
+    )
+    {{after}}
+    ORDER BY COALESCE(t.imdb_rating, -1) DESC, COALESCE(t.release_date, DATE '0001-01-01') DESC, -t.id DESC
+    LIMIT :limit
+"""
+
+_AFTER_SQL = f"AND ({_SORT_KEY}) < (:rating_key, :date_key, -:last_id)"
+
+
+def select_page(db, source: str, after=None, limit: int = PAGE_SIZE):
+    """One page of titles without `source` vibe text, after row `after`
+    (the last row of the previous page)."""
+    params = {"source": source, "limit": limit}
+    if after is not None:
+        params.update(rating_key=after.rating_key, date_key=after.date_key, last_id=after.id)
+
+    sql = _PAGE_SQL.format(after=_AFTER_SQL if after is not None else "")
+    return db.execute(text(sql), params).fetchall()
+
+
+def titles_needing_vibes(db, source: str = "youtube", page_size: int = PAGE_SIZE) -> Iterator[Tuple[int, str]]:
+    """Yield (title_id, title) in priority order, page by page."""
+    after = None
+    while True:
+        rows = select_page(db, source, after, page_size)
+        # End the read transaction between pages; callers commit their own work
+        db.commit()
+
+        for row in rows:
+            yield row.id, row.title
+
+        if len(rows) < page_size:
+            return
+        after = rows[-1]
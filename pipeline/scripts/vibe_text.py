@@ -0,0 +1,112 @@
+# vibe_text.py
+#
+# Preprocessing for YouTube vibe text before embedding.
+#
+# A raw vibe blob is video titles, descriptions, tags and comments for one
+# title (one per line since fetch_youtube_vibes joins them with newlines).
+# MiniLM only looks at the first 256 tokens of its input, so instead of
+# embedding the blob as one string we clean it, drop duplicates and
+# boilerplate, pack it into chunks that fit the model, embed every chunk
+# and mean-pool the chunk vectors per title.
+
+import re
+from typing import List
+
+import numpy as np
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; ~1.3 pieces per English
+# word keeps 160-word chunks inside the window
+MAX_CHUNK_WORDS = 160
+# Bounds encode cost per title (16 chunks ~ 2.5k words)
+MAX_CHUNKS_PER_TITLE = 16
+# Parts shorter than this carry no vibe ("lol", "first!", "2:31")
+MIN_PART_CHARS = 8
+
+URL_RE = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+HANDLE_RE = re.compile(r"(?<!\w)@\w+")
+TIMESTAMP_RE = re.compile(r"\b\d{1,2}:\d{2}(:\d{2})?\b")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Channel/description boilerplate; a line mentioning any of these is dropped
+BOILERPLATE_RE = re.compile(
+    r"\b(subscribe|subscribers?|notification bell|like and share|follow us|"
+    r"instagram|facebook|twitter|tiktok|patreon|discord|merch|"
+    r"all rights reserved|copyright|fair use|affiliate|sponsored)\b|©",
+    re.IGNORECASE,
+)
+
+
+def clean_part(part: str) -> str:
+    part = URL_RE.sub(" ", part)
+    part = HANDLE_RE.sub(" ", part)
+    part = TIMESTAMP_RE.sub(" ", part)
+    part = part.replace("#", " ")
+    return WHITESPACE_RE.sub(" ", part).strip()
+
+
+def split_parts(raw_text: str) -> List[str]:
+    """Cleaned, de-duplicated, boilerplate-free lines of a vibe blob."""
+    parts = []
+    seen = set()
+
+    # Older blobs were joined with spaces into one line, so boilerplate is
+    # judged per sentence, never per line
+    for line in raw_text.splitlines():
+        for part in SENTENCE_RE.split(line):
+            if BOILERPLATE_RE.search(part):
+                # A run-on part too long to be boilerplate only loses the match
+                if len(part.split()) <= MAX_CHUNK_WORDS:
+                    continue
+                part = BOILERPLATE_RE.sub(" ", part)
+
+            part = clean_part(part)
+            key = part.lower()
+            if len(part) < MIN_PART_CHARS or key in seen:
+                continue
+            seen.add(key)
+            parts.append(part)
+
+    return parts
+
+
+def chunk_vibe_text(
+    raw_text: str,
+    max_words: int = MAX_CHUNK_WORDS,
+    max_chunks: int = MAX_CHUNKS_PER_TITLE,
+) -> List[str]:
+    """Pack a vibe blob into at most `max_chunks` chunks of <= `max_words` words."""
+    chunks: List[str] = []
+    current: List[str] = []
+
+    def close():
+        if current:
+            chunks.append(" ".join(current))
+            current.clear()
+
+    for part in split_parts(raw_text):
+        words = part.split()
+
+        if len(current) + len(words) > max_words:
+            close()
+        # A single part longer than a chunk is split on word boundaries
+        while len(words) > max_words:
+            chunks.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+
+        if len(chunks) >= max_chunks:
+            break
+
+    close()
+    return chunks[:max_chunks]
+
+
+def mean_pool(vectors: np.ndarray, owners: np.ndarray, count: int) -> np.ndarray:
+    """Average chunk vectors per owner (0..count-1) and re-normalize rows."""
+    pooled = np.zeros((count, vectors.shape[1]), dtype=np.float32)
+    np.add.at(pooled, owners, vectors)
+
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    np.divide(pooled, norms, out=pooled, where=norms > 0)
+    return pooled
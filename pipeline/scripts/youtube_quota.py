@@ -0,0 +1,124 @@
+# youtube_quota.py
+#
+# Cost accounting for the YouTube Data API daily quota.
+#
+# Every call is charged before it is made (YouTube bills failed calls
+# too), and a call that would take the day's total over the budget is
+# refused with QuotaExceeded, so a run stops exactly at the budget.
+# Usage is kept per call type in `youtube_quota_usage`, keyed by the
+# Pacific-time day the quota resets on, so several runs on the same day
+# share one budget. Each save adds what this run spent since the last save
+# to the stored totals, so concurrent runs don't overwrite each other.
+
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Tuple
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import youtube_quota_usage
+
+load_dotenv()
+
+# Units per call (https://developers.google.com/youtube/v3/determine_quota_cost)
+UNIT_COSTS = {
+    "search": 100,
+    "videos": 1,
+    "commentThreads": 1,
+}
+
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+
+# The quota resets at midnight Pacific Time
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def quota_day() -> date:
+    return datetime.now(QUOTA_TZ).date()
+
+
+class QuotaPlanner:
+    """Thread-safe budget for one day's YouTube API calls."""
+
+    def __init__(self, budget: int = YOUTUBE_DAILY_QUOTA):
+        self.budget = budget
+        self.day = quota_day()
+        self.calls: Dict[str, int] = {t: 0 for t in UNIT_COSTS}
+        self.units: Dict[str, int] = {t: 0 for t in UNIT_COSTS}
+        # (day, call_type) -> [calls, units] spent since the last save
+        self._unsaved: Dict[Tuple[date, str], list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, db, budget: int = YOUTUBE_DAILY_QUOTA) -> "QuotaPlanner":
+        """Planner for today, starting from what earlier runs already spent."""
+        planner = cls(budget)
+        rows = db.execute(
+            select(youtube_quota_usage.c.call_type, youtube_quota_usage.c.calls, youtube_quota_usage.c.units)
+            .where(youtube_quota_usage.c.day == planner.day)
+        ).fetchall()
+        for call_type, calls, units in rows:
+            planner.calls[call_type] = calls
+            planner.units[call_type] = units
+        return planner
+
+    @property
+    def spent(self) -> int:
+        return sum(self.units.values())
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.budget - self.spent)
+
+    def can_afford(self, units: int) -> bool:
+        return self.remaining >= units
+
+    def spend(self, call_type: str) -> None:
+        """Charge one `call_type` call, or raise QuotaExceeded."""
+        cost = UNIT_COSTS[call_type]
+        with self._lock:
+            today = quota_day()
+            if today != self.day:
+                # Crossed Pacific midnight: the quota was reset
+                self.day = today
+                self.calls = {t: 0 for t in UNIT_COSTS}
+                self.units = {t: 0 for t in UNIT_COSTS}
+
+            if self.spent + cost > self.budget:
+                raise QuotaExceeded(f"{call_type} needs {cost} units, {self.remaining} left of {self.budget}")
+            self.calls[call_type] += 1
+            self.units[call_type] += cost
+            delta = self._unsaved.setdefault((self.day, call_type), [0, 0])
+            delta[0] += 1
+            delta[1] += cost
+
+    def save(self, db) -> None:
+        """Add the spend since the last save to the stored totals (commits)."""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+
+        if unsaved:
+            stmt = pg_insert(youtube_quota_usage).values([
+                {"day": day, "call_type": call_type, "calls": calls, "units": units}
+                for (day, call_type), (calls, units) in unsaved.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[youtube_quota_usage.c.day, youtube_quota_usage.c.call_type],
+                set_={
+                    "calls": youtube_quota_usage.c.calls + stmt.excluded.calls,
+                    "units": youtube_quota_usage.c.units + stmt.excluded.units,
+                },
+            ))
+        db.commit()
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{t} {self.calls[t]}× = {self.units[t]}u" for t in UNIT_COSTS)
+        return f"{self.spent}/{self.budget} units ({parts})"
@@ -0,0 +1,7 @@
+# Pipeline scripts import each other by bare module name (they are run as
+# `python pipeline/scripts/<script>.py`), so put that directory on the path.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
@@ -0,0 +1,57 @@
+import pytest
+
+from bulk_writer import BulkWriter
+from models import combined_embeddings, titles
+
+
+def merge_sql(**kwargs):
+    writer = BulkWriter(None, titles, "imdb_id", ["title", "plot"], **kwargs)
+    return writer._merge_sql().replace(writer._stage, "stage")
+
+
+def test_insert():
+    assert merge_sql(mode="insert") == (
+        "INSERT INTO titles (imdb_id, title, plot) SELECT imdb_id, title, plot FROM stage "
+        "ON CONFLICT (imdb_id) DO NOTHING RETURNING imdb_id"
+    )
+
+
+def test_upsert():
+    assert merge_sql(mode="upsert") == (
+        "INSERT INTO titles (imdb_id, title, plot) SELECT imdb_id, title, plot FROM stage "
+        "ON CONFLICT (imdb_id) DO UPDATE SET title = EXCLUDED.title, plot = EXCLUDED.plot "
+        "RETURNING imdb_id"
+    )
+
+
+def test_upsert_fill_only_keeps_stored_values():
+    assert "DO UPDATE SET title = COALESCE(titles.title, EXCLUDED.title), " \
+           "plot = COALESCE(titles.plot, EXCLUDED.plot)" in merge_sql(mode="upsert", fill_only=True)
+
+
+def test_update():
+    assert merge_sql(mode="update") == (
+        "UPDATE titles AS t SET title = s.title, plot = s.plot "
+        "FROM stage AS s WHERE t.imdb_id = s.imdb_id RETURNING t.imdb_id"
+    )
+
+
+def test_update_fill_only_keeps_stored_values():
+    assert merge_sql(mode="update", fill_only=True).startswith(
+        "UPDATE titles AS t SET title = COALESCE(t.title, s.title), plot = COALESCE(t.plot, s.plot) "
+    )
+
+
+def test_composite_key():
+    writer = BulkWriter(None, combined_embeddings, ["title_id", "profile"], ["embedding"])
+    sql = writer._merge_sql()
+
+    assert writer.columns == ["title_id", "profile", "embedding"]
+    assert "ON CONFLICT (title_id, profile) DO UPDATE SET embedding = EXCLUDED.embedding" in sql
+    assert sql.endswith("RETURNING title_id, profile")
+    assert writer._key_of({"title_id": 1, "profile": "default", "embedding": None}) == (1, "default")
+
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        BulkWriter(None, titles, "imdb_id", ["title"], mode="merge")
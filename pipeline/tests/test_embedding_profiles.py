@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from embedding_profiles import load_profiles, weights_hash
+
+
+def write(tmp_path, profiles):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps(profiles))
+    return str(path)
+
+
+def test_unlisted_sources_get_zero(tmp_path):
+    profiles = load_profiles(write(tmp_path, {"default": {"plot": 0.7, "youtube": 0.3}, "plot_only": {"plot": 1}}))
+
+    assert profiles["default"] == {"plot": 0.7, "youtube": 0.3, "reddit": 0.0}
+    assert profiles["plot_only"] == {"plot": 1.0, "youtube": 0.0, "reddit": 0.0}
+
+
+@pytest.mark.parametrize("profiles", [
+    {"other": {"plot": 1}},
+    {"default": {"plot": 1, "tiktok": 1}},
+    {"default": {"plot": 0, "youtube": 0}},
+    {"default": {"plot": 1.5, "youtube": -0.5}},
+])
+def test_invalid_profiles(tmp_path, profiles):
+    with pytest.raises(ValueError):
+        load_profiles(write(tmp_path, profiles))
+
+
+def test_weights_hash_ignores_key_order():
+    a = weights_hash({"plot": 0.7, "youtube": 0.3, "reddit": 0.0})
+    b = weights_hash({"reddit": 0.0, "youtube": 0.3, "plot": 0.7})
+
+    assert a == b
+    assert a != weights_hash({"plot": 0.6, "youtube": 0.4, "reddit": 0.0})
+    assert len(a) == 16
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import fetch_youtube_vibes
+from response_cache import ResponseCache
+
+
+class FakeHttpError(Exception):
+    """Shaped like googleapiclient.errors.HttpError (status and JSON body)."""
+
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.resp = type("Resp", (), {"status": status})()
+        self.content = json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode()
+
+
+class FakeYouTube:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def commentThreads(self):
+        return self
+
+    def list(self, **params):
+        return self
+
+    def execute(self):
+        self.calls += 1
+        raise self.error
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(fetch_youtube_vibes, "get_cache", lambda: cache)
+    return cache
+
+
+def fetch_with_error(monkeypatch, error):
+    youtube = FakeYouTube(error)
+    monkeypatch.setattr(fetch_youtube_vibes, "get_youtube", lambda: youtube)
+    return fetch_youtube_vibes.fetch_comments("vid1")
+
+
+def test_comments_disabled_is_cached(cache, monkeypatch):
+    assert fetch_with_error(monkeypatch, FakeHttpError(403, "commentsDisabled")) == []
+    assert cache.peek("youtube_comments", {"video_id": "vid1"})[0] == []
+
+
+@pytest.mark.parametrize("reason", ["quotaExceeded", "forbidden", "keyInvalid"])
+def test_other_403s_are_not_cached(cache, monkeypatch, reason):
+    assert fetch_with_error(monkeypatch, FakeHttpError(403, reason)) == []
+    assert cache.peek("youtube_comments", {"video_id": "vid1"}) is None
+
+
+def test_error_details_from_newer_clients(cache, monkeypatch):
+    error = FakeHttpError(403, "forbidden")
+    error.error_details = [{"reason": "commentsDisabled"}]
+
+    fetch_with_error(monkeypatch, error)
+
+    assert cache.peek("youtube_comments", {"video_id": "vid1"})[0] == []
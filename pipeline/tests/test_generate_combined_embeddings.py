@@ -0,0 +1,63 @@
+import numpy as np
+
+from generate_combined_embeddings import VECTOR_DIM, combine_matrices, to_matrix
+
+WEIGHTS = {"plot": 0.7, "youtube": 0.3, "reddit": 0.0}
+
+
+def unit(seed):
+    v = np.random.default_rng(seed).standard_normal(VECTOR_DIM).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def combine(rows):
+    """rows: one {source: vector or None} dict per title."""
+    matrices, present = {}, {}
+    for source in WEIGHTS:
+        matrices[source], present[source] = to_matrix([r.get(source) for r in rows])
+    return combine_matrices(matrices, present, WEIGHTS)
+
+
+def test_plot_only_row_is_the_plot_vector():
+    plot = unit(1)
+
+    np.testing.assert_allclose(combine([{"plot": plot}])[0], plot, atol=1e-6)
+
+
+def test_youtube_only_row_is_the_youtube_vector():
+    youtube = unit(2)
+
+    np.testing.assert_allclose(combine([{"youtube": youtube}])[0], youtube, atol=1e-6)
+
+
+def test_plot_and_youtube_are_weighted_and_normalized():
+    plot, youtube = unit(1), unit(2)
+    expected = 0.7 * plot + 0.3 * youtube
+    expected /= np.linalg.norm(expected)
+
+    np.testing.assert_allclose(combine([{"plot": plot, "youtube": youtube}])[0], expected, atol=1e-6)
+
+
+def test_zero_weight_source_is_ignored():
+    plot, reddit = unit(1), unit(3)
+
+    np.testing.assert_allclose(combine([{"plot": plot, "reddit": reddit}])[0], plot, atol=1e-6)
+
+
+def test_all_missing_row_is_zero():
+    rows = [{"plot": unit(1)}, {}, {"reddit": unit(3)}]
+
+    combined = combine(rows)
+
+    assert combined.shape == (3, VECTOR_DIM)
+    assert not combined[1].any()
+    # Only a zero-weight source present: nothing to combine
+    assert not combined[2].any()
+    np.testing.assert_allclose(np.linalg.norm(combined[0]), 1.0, atol=1e-6)
+
+
+def test_wrong_dimension_counts_as_missing():
+    matrix, present = to_matrix([unit(1), np.ones(10, dtype=np.float32), None])
+
+    assert present.tolist() == [True, False, False]
+    assert not matrix[1].any()
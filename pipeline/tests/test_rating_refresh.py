@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+import pytest
+
+from rating_refresh import MAX_INTERVAL, MIN_INTERVAL, refresh_interval, title_age_days
+
+TODAY = date(2026, 6, 1)
+
+
+@pytest.mark.parametrize("age_days, expected", [
+    (0, 1),
+    (30, 1),
+    (31, 7),
+    (180, 7),
+    (181, 30),
+    (730, 30),
+    (731, 180),
+    (20 * 365, 180),
+])
+def test_age_tiers(age_days, expected):
+    released = TODAY - timedelta(days=age_days)
+
+    assert refresh_interval(released, None, None, None, TODAY) == timedelta(days=expected)
+
+
+def test_year_only_and_unknown_age():
+    assert title_age_days(None, 2026, TODAY) == (TODAY - date(2026, 1, 1)).days
+    assert refresh_interval(None, None, None, None, TODAY) == timedelta(days=30)
+
+
+@pytest.mark.parametrize("old_votes, new_votes, expected", [
+    (1000, 1100, 15),   # >= 10% growth: halved
+    (1000, 1050, 30),   # in between: base
+    (1000, 1005, 60),   # < 1% growth: doubled
+    (None, 5000, 30),   # nothing to compare
+    (0, 5000, 30),
+])
+def test_vote_growth_scaling(old_votes, new_votes, expected):
+    released = TODAY - timedelta(days=365)
+
+    assert refresh_interval(released, None, old_votes, new_votes, TODAY) == timedelta(days=expected)
+
+
+def test_interval_is_clamped():
+    new = TODAY - timedelta(days=1)
+    old = TODAY - timedelta(days=20 * 365)
+
+    assert refresh_interval(new, None, 100, 1000, TODAY) == MIN_INTERVAL
+    assert refresh_interval(old, None, 1000, 1000, TODAY) == timedelta(days=360)
+    assert refresh_interval(old, None, 1000, 1000, TODAY) <= MAX_INTERVAL
@@ -0,0 +1,56 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"value": 1_000_000.0}
+    monkeypatch.setattr(response_cache.time, "time", lambda: now["value"])
+    return now
+
+
+def test_get_respects_max_age_and_entry_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    cache.put("omdb", {"i": "tt1"}, {"Title": "A"})
+    cache.put("omdb", {"i": "tt2"}, {"Error": "Movie not found!"}, ttl=10)
+
+    clock["value"] += 60
+
+    assert cache.get("omdb", {"i": "tt1"}, max_age=100) == {"Title": "A"}
+    assert cache.get("omdb", {"i": "tt1"}, max_age=30) is None
+    assert cache.get("omdb", {"i": "tt2"}, max_age=100) is None
+    assert cache.get("omdb", {"i": "tt3"}, max_age=100) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["stale"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_peek_ignores_freshness(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    cache.put("youtube_comments", {"v": "x"}, ["a"], ttl=1)
+
+    clock["value"] += 50
+
+    assert cache.peek("youtube_comments", {"v": "x"}) == (["a"], 50)
+    assert cache.peek("youtube_comments", {"v": "y"}) is None
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    value = "x" * 100
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=350)
+
+    for i in range(3):
+        cache.put("ns", {"i": i}, value)
+        clock["value"] += 1
+    # Touch 0 so 1 is now the least recently used
+    assert cache.get("ns", {"i": 0}, max_age=100) == value
+    clock["value"] += 1
+
+    cache.put("ns", {"i": 3}, value)
+
+    assert cache.stats()["bytes"] <= 350 * response_cache.EVICT_TO
+    assert cache.peek("ns", {"i": 1}) is None
+    assert cache.peek("ns", {"i": 0}) is not None
+    assert cache.peek("ns", {"i": 3}) is not None
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+import omdb_client
+import update_ratings
+
+LIMIT = {"Response": "False", "Error": "Request limit reached!"}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """OMDb stand-in: titles from `limit_at` on get OMDb's 401 limit answer."""
+
+    def __init__(self, limit_at):
+        self.limit_at = limit_at
+        self.requests = []
+
+    def get(self, url, params, timeout):
+        imdb_id = params["i"]
+        self.requests.append(imdb_id)
+        if int(imdb_id[2:]) >= self.limit_at:
+            return FakeResponse(401, LIMIT)
+        return FakeResponse(200, {"Response": "True", "imdbRating": "7.1", "imdbVotes": "1,234"})
+
+
+@pytest.fixture
+def omdb(monkeypatch):
+    session = FakeSession(limit_at=3)
+    monkeypatch.setattr(omdb_client, "get_session", lambda: session)
+    monkeypatch.setattr(omdb_client, "OMDB_CACHE_ENABLED", False)
+    monkeypatch.setattr(omdb_client, "_client", omdb_client.OmdbClient(
+        api_key="test", requests_per_second=1000, max_workers=1, backoff=0,
+    ))
+    return session
+
+
+def test_request_returns_401_error_body_without_retrying(omdb):
+    client = omdb_client.get_omdb_client()
+
+    assert client.fetch("tt0000003", errors=True) == LIMIT
+    assert client.fetch("tt0000004") is None
+    assert omdb.requests == ["tt0000003", "tt0000004"]
+
+
+def test_update_all_ratings_stops_at_the_daily_limit(omdb, monkeypatch, capsys):
+    rows = [
+        SimpleNamespace(id=n, imdb_id=f"tt{n:07d}", year=2024, release_date=None,
+                        imdb_rating=None, imdb_votes=None, last_refreshed_at=None)
+        for n in range(1, 11)
+    ]
+    monkeypatch.setattr(update_ratings, "ensure_schema", lambda: None)
+    monkeypatch.setattr(update_ratings, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+    monkeypatch.setattr(update_ratings, "due_titles", lambda db, now, limit=None, full=False: rows)
+
+    updated, failed = update_ratings.update_all_ratings(dry_run=True)
+
+    out = capsys.readouterr().out
+    assert "OMDb limit reached at tt0000003" in out
+    assert out.count("DRY: ") == 2
+    assert failed == 0
+    # Only the few requests already in flight when the limit hit were sent
+    assert len(omdb.requests) < len(rows)
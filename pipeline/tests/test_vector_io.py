@@ -0,0 +1,30 @@
+import struct
+
+import numpy as np
+
+from vector_io import VectorBinaryDumper, VectorBinaryLoader
+
+
+def test_binary_round_trip():
+    values = np.array([0.5, -1.25, 3.0e-8, 1234.5], dtype=np.float32)
+
+    data = bytes(VectorBinaryDumper(np.ndarray).dump(values))
+
+    # pgvector wire format: big-endian uint16 dim, uint16 unused, then float32s
+    assert len(data) == 4 + 4 * len(values)
+    assert struct.unpack(">HH", data[:4]) == (len(values), 0)
+    assert struct.unpack(">f", data[4:8]) == (0.5,)
+
+    loaded = VectorBinaryLoader(0).load(data)
+
+    assert loaded.dtype == np.float32
+    np.testing.assert_array_equal(loaded, values)
+
+
+def test_dump_accepts_lists_and_full_size_vectors():
+    values = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+
+    data = bytes(VectorBinaryDumper(list).dump(values.tolist()))
+
+    assert struct.unpack(">HH", data[:4]) == (384, 0)
+    np.testing.assert_array_equal(VectorBinaryLoader(0).load(memoryview(data)), values)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from vibe_text import MAX_CHUNK_WORDS, chunk_vibe_text, mean_pool, split_parts
+
+
+def test_split_parts_keeps_old_single_line_blob():
+    # Pre-newline blobs: everything joined with spaces on one line
+    blob = (
+        "Great trailer, cannot wait for this one. Please subscribe to my channel! "
+        "The score is amazing and the cast looks perfect. like and share"
+    )
+
+    assert split_parts(blob) == [
+        "Great trailer, cannot wait for this one.",
+        "The score is amazing and the cast looks perfect.",
+    ]
+
+
+def test_split_parts_multi_line_blob():
+    blob = "\n".join([
+        "Official Trailer",
+        "Subscribe for more trailers: https://example.com",
+        "This looks incredible @someone",
+        "this looks incredible",
+        "lol",
+        "2:31 best scene",
+    ])
+
+    assert split_parts(blob) == ["Official Trailer", "This looks incredible", "best scene"]
+
+
+def test_split_parts_long_run_on_only_loses_boilerplate():
+    blob = " ".join(["tense"] * MAX_CHUNK_WORDS) + " subscribe " + " ".join(["drama"] * 5)
+
+    parts = split_parts(blob)
+
+    assert len(parts) == 1
+    assert "subscribe" not in parts[0]
+    assert parts[0].endswith("drama")
+
+
+def test_chunk_vibe_text_respects_limits():
+    blob = "\n".join(f"comment number {i} about a tense ending" for i in range(200))
+
+    chunks = chunk_vibe_text(blob, max_words=20, max_chunks=4)
+
+    assert len(chunks) == 4
+    assert all(len(c.split()) <= 20 for c in chunks)
+
+
+def test_chunk_vibe_text_empty_after_cleaning():
+    assert chunk_vibe_text("subscribe\nlol\nhttps://example.com") == []
+
+
+def test_mean_pool_normalizes_per_owner():
+    vectors = np.array([[1, 0], [0, 1], [3, 4]], dtype=np.float32)
+
+    pooled = mean_pool(vectors, np.array([0, 0, 1]), 2)
+
+    np.testing.assert_allclose(pooled, [[0.70710677, 0.70710677], [0.6, 0.8]], rtol=1e-6)
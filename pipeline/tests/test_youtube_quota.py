@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+
+import youtube_quota
+from youtube_quota import QuotaExceeded, QuotaPlanner
+
+
+@pytest.fixture
+def today(monkeypatch):
+    day = {"value": date(2026, 1, 1)}
+    monkeypatch.setattr(youtube_quota, "quota_day", lambda: day["value"])
+    return day
+
+
+def test_spend_up_to_budget_exactly(today):
+    quota = QuotaPlanner(budget=102)
+
+    quota.spend("search")
+    quota.spend("videos")
+    quota.spend("commentThreads")
+
+    assert quota.spent == 102
+    assert quota.remaining == 0
+    assert not quota.can_afford(1)
+
+
+def test_spend_over_budget_raises_and_charges_nothing(today):
+    quota = QuotaPlanner(budget=150)
+    quota.spend("search")
+
+    with pytest.raises(QuotaExceeded):
+        quota.spend("search")
+
+    assert quota.calls["search"] == 1
+    assert quota.spent == 100
+
+
+def test_spend_after_midnight_starts_a_new_day(today):
+    quota = QuotaPlanner(budget=100)
+    quota.spend("search")
+
+    today["value"] = date(2026, 1, 2)
+    quota.spend("search")
+
+    assert quota.day == date(2026, 1, 2)
+    assert quota.spent == 100
+    assert quota._unsaved == {
+        (date(2026, 1, 1), "search"): [1, 100],
+        (date(2026, 1, 2), "search"): [1, 100],
+    }